@@ -1,17 +1,28 @@
 import os
+import sys
+import csv
+import operator
+import uuid
+import string
 import json
 import re
-import pandas as pd
-from pydantic import BaseModel, Field
+import orjson
+import asyncio
+import functools
 import logging
-from typing import Optional, List
+from logging.handlers import MemoryHandler
+from typing import Optional, List, FrozenSet
+from urllib.parse import urlparse
 from datetime import datetime, UTC
 from dotenv import load_dotenv
 import time
 import random
 from google import genai
+import httpx
 import requests
 from bs4 import BeautifulSoup
+from json_repair import repair_json
+import llm_cache
 
 ## ---1. CONFIGURATION
 # LOAD ENVIRONMENT VARIABLES
@@ -28,6 +39,7 @@ CONFIG_PATH = "config/sources_list.json"
 DATA_DIR = "data/processed"
 LOG = 'data/log'
 RAW_OUTPUT_DIR = os.path.join(DATA_DIR, "raw_output.jsonl")
+PROCESSED_URLS_FILE = os.path.join(DATA_DIR, "processed_urls.txt")   # one URL per line, appended on save
 
 # Using UTC time for robust timestamping
 now_utc = datetime.now(UTC).strftime('%Y-%m-%d_%H-%M-%S')
@@ -40,10 +52,12 @@ os.makedirs(LOG, exist_ok=True)
 
 
 # configure logging
+# File writes are batched (flushed every 1000 records, on ERROR, and at exit)
+file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+file_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
 logging.basicConfig(
-    filename=LOG_FILE,
     level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[MemoryHandler(capacity=1000, flushLevel=logging.ERROR, target=file_handler)],
 )
 # Stream to console too
 logging.getLogger().addHandler(logging.StreamHandler())
@@ -53,8 +67,8 @@ logging.info("=== GRANT EXTRACTION PIPELINE V2 INITIALIZED ===")
 
 #load sources
 try:
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        SOURCES = json.load(f).get("sources", [])
+    with open(CONFIG_PATH, "rb") as f:
+        SOURCES = orjson.loads(f.read()).get("sources", [])
         logging.info(f"Loaded {len(SOURCES)} sources from {CONFIG_PATH}")
 except FileNotFoundError:
     logging.error(f"Sources file not found at {CONFIG_PATH}. Please ensure '{CONFIG_PATH}' exists.")
@@ -65,14 +79,35 @@ if not SOURCES:
 
 
 # Initialize Gemini Client
-client = genai.Client(api_key=API_KEY)
+# One pooled httpx transport shared by every async request, so TLS connections are kept alive across URLs
+# (passing a transport also keeps genai on httpx rather than aiohttp)
+client = genai.Client(
+    api_key=API_KEY,
+    http_options=genai.types.HttpOptions(
+        timeout=60_000,
+        async_client_args={
+            "transport": httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+            )
+        },
+    ),
+)
 MODEL_NAME = "gemini-2.5-flash" 
 TEMPERATURE = 0.3              
 MAX_TOKENS = 8096
+MAX_CONCURRENT_REQUESTS = 16    # URLs extracted in parallel
+DEBUG_SAVE = os.getenv("DEBUG_SAVE", "1") != "0"   # set DEBUG_SAVE=0 to skip raw response files
+
+# Same settings for every request, so the config object is built once
+GENERATION_CONFIG = genai.types.GenerateContentConfig(
+    temperature=TEMPERATURE,
+    max_output_tokens=MAX_TOKENS,
+    # No tools - using actual page content instead
+)
 
 
 # ENUM MAPPINGS FOR VALIDATION
-VALID_FUNDER_TYPES = [
+VALID_FUNDER_TYPES = frozenset({
     "FEDERAL_GRANT",
     "PROVINCIAL_TERRITORIAL_GRANT",
     "MUNICIPAL_GRANT",
@@ -82,18 +117,18 @@ VALID_FUNDER_TYPES = [
     "UNIVERSITY_COLLEGE_GRANT",
     "ACCELERATOR_INCUBATOR_GRANT",
     "OTHER"
-]
+})
 
-VALID_FUNDING_TYPES = [
+VALID_FUNDING_TYPES = frozenset({
     "GRANT",
     "LOAN",
     "EQUITY",
     "TAX_CREDIT",
     "PRIZE",
     "IN_KIND"
-]
+})
 
-VALID_SECTORS = [
+VALID_SECTORS = frozenset({
     "AGRICULTURE",
     "HEALTH",
     "EDUCATION",
@@ -112,9 +147,9 @@ VALID_SECTORS = [
     "RETAIL",
     "OPEN_TO_ALL",
     "N_A"
-]
+})
 
-VALID_APPLICANT_TYPES = [
+VALID_APPLICANT_TYPES = frozenset({
     "INDIVIDUAL",
     "NON_PROFIT",
     "FOR_PROFIT",
@@ -122,45 +157,299 @@ VALID_APPLICANT_TYPES = [
     "PUBLIC_ENTITY",
     "OPEN_TO_ALL",
     "N_A"
-]
+})
 
-VALID_BUSINESS_STAGES = [
+VALID_BUSINESS_STAGES = frozenset({
     "IDEA",
     "EARLY_STAGE",
     "GROWTH",
     "ESTABLISHED"
-]
+})
 
-VALID_REVENUE_RANGES = [
+VALID_REVENUE_RANGES = frozenset({
     "NONE",
     "UNDER_50K",
     "BETWEEN_50K_250K",
     "BETWEEN_250K_1M",
     "BETWEEN_1M_5M",
     "ABOVE_5M"
-]
+})
 
-VALID_EMPLOYEE_RANGES = [
+VALID_EMPLOYEE_RANGES = frozenset({
     "SOLO",
     "BETWEEN_1_5",
     "BETWEEN_6_20",
     "BETWEEN_21_50",
     "ABOVE_50"
-]
+})
 
-VALID_EQUITY_FOCUS = [
+VALID_EQUITY_FOCUS = frozenset({
     "RURAL", "URBAN", "REMOTE",
     "INDIGENOUS", "WOMEN_LED", "BIPOC_LED", "MINORITY_LED",
     "YOUTH", "SENIOR", "LGBTQ_PLUS", "VETERAN", "DISABLED",
     "IMMIGRANT", "REFUGEE", "LOW_INCOME", "UNDERSERVED"
-]
+})
 
-VALID_GRANT_PURPOSE = [
+VALID_GRANT_PURPOSE = frozenset({
     "RESEARCH", "PRODUCT_DEVELOPMENT", "CAPACITY_BUILDING",
     "INFRASTRUCTURE", "PROGRAM_EXPANSION", "OPERATIONAL",
     "CAPITAL", "EQUIPMENT", "TRAINING", "COMMUNITY_ENGAGEMENT",
     "MARKETING", "TECHNOLOGY", "HIRING"
-]
+})
+
+
+# Common variations returned by the model, mapped onto the enums above.
+# Add new entries here when the logs show "Invalid ... Skipping" warnings.
+SECTOR_MAPPINGS = {
+    # Health/Medical/Life Sciences
+    "HEALTHCARE": "HEALTH",
+    "HEALTHCARE TECHNOLOGY": "HEALTH",
+    "DIGITAL HEALTH": "HEALTH",
+    "MEDICAL DEVICES": "HEALTH",
+    "DIAGNOSTICS": "HEALTH",
+    "THERAPEUTICS": "HEALTH",
+    "HEALTH TECHNOLOGY": "HEALTH",
+    "BIOMARKERS": "HEALTH",
+    "MEDICAL TECHNOLOGY": "HEALTH",
+    "HEALTHTECH": "HEALTH",
+    "MEDTECH": "HEALTH",
+    "VIRTUAL CARE": "HEALTH",
+    "PRECISION HEALTH": "HEALTH",
+    "REGENERATIVE MEDICINE": "HEALTH",
+    "ADVANCED MEDICAL IMAGING": "HEALTH",
+    "PERSONALIZED MEDICINE": "HEALTH",
+    "PUBLIC HEALTH": "HEALTH",
+    "HEALTH SYSTEM INNOVATION": "HEALTH",
+    "BIOTECH": "HEALTH",
+    "BIOTECHNOLOGY": "HEALTH",
+    "PHARMA": "HEALTH",
+    "PHARMACEUTICAL": "HEALTH",
+    "LIFE SCIENCES": "HEALTH",
+    "LIFE_SCIENCES": "HEALTH",
+    "HEALTH SCIENCES": "HEALTH",
+    # Technology/Digital
+    "ARTIFICIAL INTELLIGENCE": "TECHNOLOGY",
+    "MACHINE LEARNING": "TECHNOLOGY",
+    "DATA ANALYTICS": "TECHNOLOGY",
+    "REMOTE MONITORING": "TECHNOLOGY",
+    "ROBOTICS": "TECHNOLOGY",
+    "AUTOMATION": "TECHNOLOGY",
+    "SOFTWARE": "TECHNOLOGY",
+    "IT": "TECHNOLOGY",
+    "INFORMATION TECHNOLOGY": "TECHNOLOGY",
+    "INFORMATION_TECHNOLOGY": "TECHNOLOGY",
+    "INFORMATION AND COMMUNICATIONS TECHNOLOGY (ICT)": "TECHNOLOGY",
+    "ICT": "TECHNOLOGY",
+    "DIGITAL ECONOMY": "TECHNOLOGY",
+    "DIGITAL TECHNOLOGIES": "TECHNOLOGY",
+    "DEEP TECH": "TECHNOLOGY",
+    "INNOVATION": "TECHNOLOGY",
+    "CLIMATE TECH": "ENERGY",
+    # Energy/CleanTech
+    "CLEANTECH": "ENERGY",
+    "CLEAN TECHNOLOGY": "ENERGY",
+    "CLEAN GROWTH": "ENERGY",
+    # Agriculture/Food
+    "AGTECH": "AGRICULTURE",
+    "AGRI-FOOD": "AGRICULTURE",
+    "AGRI_FOOD": "AGRICULTURE",
+    # Finance
+    "FINTECH": "FINANCE",
+    # Education
+    "EDTECH": "EDUCATION",
+    # Arts & Culture
+    "ARTS": "CREATIVE",
+    "CULTURE": "CREATIVE",
+    "ARTS AND CULTURE": "CREATIVE",
+    "PERFORMING ARTS": "CREATIVE",
+    "VISUAL ARTS": "CREATIVE",
+    "LITERARY ARTS": "CREATIVE",
+    "MEDIA ARTS": "CREATIVE",
+    "CRAFT": "CREATIVE",
+    "DESIGN": "CREATIVE",
+    "COMMUNITY ARTS": "CREATIVE",
+    "CREATIVE INDUSTRIES": "CREATIVE",
+    "CREATIVE ARTS": "CREATIVE",
+    "CULTURAL INDUSTRIES": "CREATIVE",
+    # Hospitality/Tourism
+    "TOURISM": "HOSPITALITY",
+    # Manufacturing/Materials
+    "ADVANCED MATERIALS": "MANUFACTURING",
+    "ADVANCED MANUFACTURING": "MANUFACTURING",
+    "AUTOMOTIVE": "MANUFACTURING",
+    "AEROSPACE": "MANUFACTURING",
+    "STEEL": "MANUFACTURING",
+    # Transportation
+    "TRANSPORTATION": "TRANSPORTATION",
+    # Science/Research/Academia
+    "SCIENCE": "TECHNOLOGY",
+    "ENGINEERING": "TECHNOLOGY",
+    "SOCIAL SCIENCES": "SOCIAL_SERVICES",
+    "HUMANITIES": "EDUCATION",
+    # Social Impact
+    "SOCIAL IMPACT": "SOCIAL_SERVICES",
+    # Business/General
+    "EXPORT-ORIENTED BUSINESSES": "OPEN_TO_ALL",
+    "GENERAL BUSINESS INNOVATION": "OPEN_TO_ALL",
+    "GENERAL BUSINESS": "OPEN_TO_ALL",
+    "ECONOMIC DIVERSIFICATION": "OPEN_TO_ALL",
+    "OTHER PRIORITY SECTORS": "OPEN_TO_ALL",
+    "ALL_SECTORS": "OPEN_TO_ALL",
+}
+
+PURPOSE_MAPPINGS = {
+    # Research & Development
+    "INNOVATION": "RESEARCH",
+    "RESEARCH_AND_DEVELOPMENT": "RESEARCH",
+    "R&D": "RESEARCH",
+    "RESEARCH & DEVELOPMENT": "RESEARCH",
+    "VALIDATION": "RESEARCH",
+    "CLINICAL_TRIALS": "RESEARCH",
+    "PROOF_OF_CONCEPT": "RESEARCH",
+    # Product Development
+    "COMMERCIALIZATION": "PRODUCT_DEVELOPMENT",
+    "PROTOTYPING": "PRODUCT_DEVELOPMENT",
+    "PRODUCT DEVELOPMENT": "PRODUCT_DEVELOPMENT",
+    "PRODUCT_DEVELOPMENT": "PRODUCT_DEVELOPMENT",
+    # Business Growth & Operations
+    "BUSINESS_GROWTH": "OPERATIONAL",
+    "BUSINESS GROWTH": "OPERATIONAL",
+    "OPERATING SUPPORT": "OPERATIONAL",
+    "PROGRAM DELIVERY": "OPERATIONAL",
+    "BUSINESS_DEVELOPMENT": "OPERATIONAL",
+    "BUSINESS DEVELOPMENT": "OPERATIONAL",
+    "PRODUCTIVITY IMPROVEMENT": "OPERATIONAL",
+    "ECONOMIC DEVELOPMENT": "OPERATIONAL",
+    "ECONOMIC_DEVELOPMENT": "OPERATIONAL",
+    "VENTURE CREATION": "OPERATIONAL",
+    "STARTUP FUNDING": "CAPITAL",
+    # Expansion & Scaling
+    "PILOT_PROJECTS": "RESEARCH",
+    "SCALING_UP": "PROGRAM_EXPANSION",
+    "SCALE_UP": "PROGRAM_EXPANSION",
+    "EXPANSION": "PROGRAM_EXPANSION",
+    "BUSINESS_EXPANSION": "PROGRAM_EXPANSION",
+    "MARKET_EXPANSION": "MARKETING",
+    "MARKET EXPANSION": "MARKETING",
+    "MARKET ENTRY & EXPANSION": "MARKETING",
+    "MARKET ENTRY": "MARKETING",
+    "EXPORT_DEVELOPMENT": "MARKETING",
+    "EXPORT DEVELOPMENT": "MARKETING",
+    # Capacity & Training
+    "HEALTH_SYSTEM_IMPROVEMENT": "CAPACITY_BUILDING",
+    "CAPACITY BUILDING": "CAPACITY_BUILDING",
+    "CAPACITY_BUILDING": "CAPACITY_BUILDING",
+    "PROFESSIONAL DEVELOPMENT": "TRAINING",
+    "TALENT DEVELOPMENT": "TRAINING",
+    "TRAINING_AND_SKILLS_DEVELOPMENT": "TRAINING",
+    # Technology & Digital
+    "TECHNOLOGY_ADOPTION": "TECHNOLOGY",
+    "TECH_ADOPTION": "TECHNOLOGY",
+    "DIGITAL_ADOPTION": "TECHNOLOGY",
+    "TECHNOLOGY ADOPTION": "TECHNOLOGY",
+    # Marketing & Market Access
+    "MARKET_ACCESS": "MARKETING",
+    "MARKET ACCESS": "MARKETING",
+    # Community & Engagement
+    "ARTS AND CULTURE": "COMMUNITY_ENGAGEMENT",
+    "COMMUNITY DEVELOPMENT": "COMMUNITY_ENGAGEMENT",
+    # Job Creation
+    "JOB CREATION": "HIRING",
+    "JOB_CREATION": "HIRING",
+    # Economic Growth
+    "ECONOMIC GROWTH": "OPERATIONAL",
+    "GLOBAL COMPETITIVENESS": "OPERATIONAL",
+}
+
+EQUITY_MAPPINGS = {
+    # Black/BIPOC/Racialized
+    "BLACK-LED": "BIPOC_LED",
+    "BLACK LED": "BIPOC_LED",
+    "BLACK": "BIPOC_LED",
+    "RACIALIZED COMMUNITIES": "BIPOC_LED",
+    "RACIALIZED GROUPS": "BIPOC_LED",
+    "VISIBLE_MINORITY": "BIPOC_LED",
+    "VISIBLE MINORITY": "BIPOC_LED",
+    "MINORITY": "MINORITY_LED",
+    "MINORITY-LED": "MINORITY_LED",
+    "MINORITY LED": "MINORITY_LED",
+    # Indigenous
+    "INDIGENOUS": "INDIGENOUS",
+    "INDIGENOUS_PEOPLE": "INDIGENOUS",
+    "INDIGENOUS PEOPLE": "INDIGENOUS",
+    # Women
+    "WOMEN-LED": "WOMEN_LED",
+    "WOMEN LED": "WOMEN_LED",
+    "WOMEN": "WOMEN_LED",
+    # LGBTQ+
+    "LGBTQ": "LGBTQ_PLUS",
+    "LGBTQ+": "LGBTQ_PLUS",
+    "LGBTQ2S+": "LGBTQ_PLUS",
+    "LGBTQ2S": "LGBTQ_PLUS",
+    # Disability
+    "DISABLED": "DISABLED",
+    "DISABILITY": "DISABLED",
+    "PEOPLE_WITH_DISABILITIES": "DISABLED",
+    "PEOPLE WITH DISABILITIES": "DISABLED",
+    # Geographic
+    "RURAL": "RURAL",
+    "URBAN": "URBAN",
+    "REMOTE": "REMOTE",
+    # Age
+    "YOUTH": "YOUTH",
+    "SENIOR": "SENIOR",
+    "SENIORS": "SENIOR",
+    # Immigration/Refugee
+    "IMMIGRANT": "IMMIGRANT",
+    "IMMIGRANTS": "IMMIGRANT",
+    "REFUGEE": "REFUGEE",
+    "REFUGEES": "REFUGEE",
+    # Veterans
+    "VETERAN": "VETERAN",
+    "VETERANS": "VETERAN",
+    # Economic
+    "LOW-INCOME": "LOW_INCOME",
+    "LOW INCOME": "LOW_INCOME",
+    "UNDERSERVED": "UNDERSERVED",
+}
+
+
+# Single shared string object per enum value, so validated records don't each carry their own copy
+_CANONICAL = {v: sys.intern(v) for v in (
+    VALID_FUNDER_TYPES | VALID_FUNDING_TYPES | VALID_SECTORS | VALID_APPLICANT_TYPES
+    | VALID_BUSINESS_STAGES | VALID_REVENUE_RANGES | VALID_EMPLOYEE_RANGES
+    | VALID_EQUITY_FOCUS | VALID_GRANT_PURPOSE
+)}
+
+
+def _build_lookup(valid_values: FrozenSet[str], mappings: Optional[dict] = None) -> dict:
+    """Merge known variations with identity entries; exact enum values take precedence."""
+    merged = {**(mappings or {}), **{v: v for v in valid_values}}
+    return {k: _CANONICAL.get(v, v) for k, v in merged.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def _identity_lookup(valid_values: FrozenSet[str]) -> dict:
+    """Lookup for enums without known variations, built once per frozenset."""
+    return _build_lookup(valid_values)
+
+
+# One dict lookup per value resolves both exact matches and mapped variations
+_SECTOR_LOOKUP = _build_lookup(VALID_SECTORS, SECTOR_MAPPINGS)
+_PURPOSE_LOOKUP = _build_lookup(VALID_GRANT_PURPOSE, PURPOSE_MAPPINGS)
+_EQUITY_LOOKUP = _build_lookup(VALID_EQUITY_FOCUS, EQUITY_MAPPINGS)
+_APPLICANT_LOOKUP = _build_lookup(VALID_APPLICANT_TYPES)
+
+_LOOKUP_BY_FIELD = {
+    "eligibleSectors": _SECTOR_LOOKUP,
+    "grantPurpose": _PURPOSE_LOOKUP,
+    "equityFocus": _EQUITY_LOOKUP,
+    "organizationType": _APPLICANT_LOOKUP,
+}
+
+
+# Fallback container for the main page text when there is no <main>/<article>
+_CONTENT_CLASS_RE = re.compile('content|main', re.I)
 
 
 def fetch_page_content(url: str) -> Optional[str]:
@@ -187,7 +476,7 @@ def fetch_page_content(url: str) -> Optional[str]:
             element.decompose()
         
         # Get main content - try to find main content area first
-        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_=re.compile('content|main', re.I)) or soup.body
+        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_=_CONTENT_CLASS_RE) or soup.body
         
         if main_content:
             text = main_content.get_text(separator='\n', strip=True)
@@ -214,8 +503,8 @@ def fetch_page_content(url: str) -> Optional[str]:
         return None
 
 
-def build_prompt(url: str, page_content: str) -> str:
-    schema_definition = """
+# Static prompt text, built once at import
+_PROMPT_SCHEMA = """
 [
     {
         "grantID": "Unique identifier (e.g., GRANT-2024-001)",
@@ -310,9 +599,10 @@ def build_prompt(url: str, page_content: str) -> str:
     }
 ]
     """
-    
-    return f"""
-You are an expert grant data extraction assistant. Extract grant information from: {url}
+
+_PROMPT_HEAD = "\nYou are an expert grant data extraction assistant. Extract grant information from: "
+
+_PROMPT_TAIL = f"""
 
 **ABSOLUTE REQUIREMENTS:**
 1. Output ONLY the JSON array - nothing else
@@ -326,7 +616,7 @@ You are an expert grant data extraction assistant. Extract grant information fro
 Your response must start with [ and end with ]
 
 SCHEMA:
-{schema_definition}
+{_PROMPT_SCHEMA}
 
 **IMPORTANT FORMATTING RULES:**
 - Keep ALL text on single continuous lines
@@ -340,86 +630,107 @@ Extract ALL grants found at the URL and return as a JSON array.
     """
 
 
+def build_prompt(url: str, page_content: str) -> str:
+    return f"{_PROMPT_HEAD}{url}{_PROMPT_TAIL}"
+
+
+# Unicode/control characters that break JSON parsing. Space-like ones are
+# replaced with a space, the rest are dropped; structural newlines are kept.
+_CLEAN_TRANS = str.maketrans({
+    '\u00a0': ' ',  # Non-breaking space
+    '\u200b': None, # Zero-width space
+    '\u2028': ' ',  # Line separator
+    '\u2029': ' ',  # Paragraph separator
+    '\r': ' ',      # Carriage return
+    '\t': ' ',      # Tab
+    **{chr(c): None for c in [*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), 0x7f]},
+})
+_MULTISPACE_RE = re.compile(r'  +')
+# Outermost [...] or {...}
+_OUTER_JSON_RE = re.compile(r'(\[.*\]|\{.*\})', re.DOTALL)
+
+
 def clean_json_string(text: str) -> str:
     """
-    Clean JSON string by removing/escaping problematic characters
+    Clean JSON string by removing/escaping problematic characters.
+    Newlines inside string values are left alone - parse_and_validate
+    decodes with strict=False, which accepts them.
     """
     # First, try to extract just the JSON array/object if there's extra text
     # Look for the outermost [ or { and matching ] or }
-    json_match = re.search(r'(\[.*\]|\{.*\})', text, re.DOTALL)
+    json_match = _OUTER_JSON_RE.search(text)
     if json_match:
         text = json_match.group(1)
     
-    # Remove common unicode characters that cause issues
-    text = text.replace('\u00a0', ' ')  # Non-breaking space
-    text = text.replace('\u200b', '')   # Zero-width space
-    text = text.replace('\u2028', ' ')  # Line separator
-    text = text.replace('\u2029', ' ')  # Paragraph separator
-    text = text.replace('\r\n', ' ')    # Windows line endings
-    text = text.replace('\r', ' ')      # Mac line endings
-    text = text.replace('\t', ' ')      # Tabs
-    
-    # Remove control characters (except newlines that are valid in JSON structure)
-    # This regex keeps structural newlines but removes embedded control chars
-    text = re.sub(r'[\x00-\x08\x0b-\x0c\x0e-\x1f\x7f]', '', text)
-    
-    # Now handle newlines more carefully - only keep those in JSON structure (between elements)
-    # Replace newlines that are likely inside string values
-    lines = text.split('\n')
-    cleaned_lines = []
-    in_string = False
-    
-    for line in lines:
-        # Count unescaped quotes to track if we're inside a string
-        quote_count = len(re.findall(r'(?<!\\)"', line))
-        
-        if in_string:
-            # We're inside a string value - join with space
-            if cleaned_lines:
-                cleaned_lines[-1] = cleaned_lines[-1].rstrip() + ' ' + line.lstrip()
-            else:
-                cleaned_lines.append(line)
-        else:
-            cleaned_lines.append(line)
-        
-        # Toggle in_string if odd number of quotes
-        if quote_count % 2 == 1:
-            in_string = not in_string
-    
-    text = '\n'.join(cleaned_lines)
+    # Replace/remove unicode and control characters in a single pass
+    text = text.translate(_CLEAN_TRANS)
     
     # Final safety: collapse multiple spaces
-    text = re.sub(r'  +', ' ', text)
+    text = _MULTISPACE_RE.sub(' ', text)
     
     return text
 
 
-def extract_from_gemini(url: str, retries: int = 3, backoff: float = 2.0) -> Optional[str]:
+# Citation tags ([cite:[...]] may span lines, [cite:...] may not) and ```json / ``` fences
+_CITE_AND_FENCE_RE = re.compile(r'(?s:\[cite:\[.*?\]\])|\[cite:.*?\]|```(?:json)?\s*')
+# Everything from the first [ or { through the last ] or }
+_BRACKET_SPAN_RE = re.compile(r'[\[\{].*[\]\}]', re.DOTALL)
+# Debug filename sanitising: every punctuation/space character except - and _ becomes a dash
+_FILENAME_TRANS = str.maketrans({c: '-' for c in string.punctuation + string.whitespace if c not in '-_'})
+_DASH_RUN_RE = re.compile(r'-+')
+_GENERIC_PATH_PARTS = frozenset({'funding', 'grants', 'programs', 'application'})
+
+
+def _debug_filename(url: str) -> str:
+    """Readable, collision-free path for the raw response of a URL."""
+    parts = urlparse(url)
+    domain = parts.netloc.removeprefix('www.')
+    path_parts = [p for p in parts.path.split('/') if p and p not in _GENERIC_PATH_PARTS]
+
+    # Last 2-3 meaningful parts of the path, or the first part of the domain
+    safe_name = '-'.join(path_parts[-3:]) if path_parts else domain.split('.')[0]
+    safe_name = _DASH_RUN_RE.sub('-', safe_name.translate(_FILENAME_TRANS)).strip('-')[:80]
+
+    # A short random suffix avoids probing the filesystem for a free name
+    date_str = datetime.now(UTC).strftime('%Y-%m-%d')
+    return os.path.join(DATA_DIR, f"{safe_name}_{date_str}_{uuid.uuid4().hex[:6]}.json")
+
+
+async def extract_from_gemini_async(url: str, sem: asyncio.Semaphore, retries: int = 3, backoff: float = 2.0) -> Optional[str]:
     """
     Handles the API call with retry/backoff.
     First fetches actual page content, then sends to Gemini for extraction.
+    The semaphore bounds how many URLs are in flight at once.
     Returns raw JSON text or None on failure.
     """
-    # First, fetch the actual page content
-    page_content = fetch_page_content(url)
+    async with sem:
+        return await _extract_with_retries(url, retries, backoff)
+
+
+async def _extract_with_retries(url: str, retries: int, backoff: float) -> Optional[str]:
+    # First, fetch the actual page content (requests is blocking, keep it off the event loop)
+    page_content = await asyncio.to_thread(fetch_page_content, url)
     if not page_content:
         logging.error(f"Could not fetch page content from {url}, skipping extraction")
         return None
     
     prompt = build_prompt(url, page_content)
+
+    # Skip the API entirely if this exact prompt + page was answered before
+    cache_key = llm_cache.make_key(MODEL_NAME, str(TEMPERATURE), prompt, page_content)
+    cached = llm_cache.get(cache_key)
+    if cached:
+        logging.info(f"Using cached Gemini response for {url}")
+        return cached
     
     for attempt in range(1, retries + 1):
         try:
             logging.info(f"Extracting from {url} (attempt {attempt}/{retries})")
             
-            response = client.models.generate_content(
+            response = await client.aio.models.generate_content(
                 model=MODEL_NAME,
                 contents=prompt,
-                config=genai.types.GenerateContentConfig(
-                    temperature=TEMPERATURE,
-                    max_output_tokens=MAX_TOKENS,
-                    # No tools - using actual page content instead
-                ),
+                config=GENERATION_CONFIG,
             )
             
             # Check if response has text
@@ -429,23 +740,13 @@ def extract_from_gemini(url: str, retries: int = 3, backoff: float = 2.0) -> Opt
                 
             raw_text = response.text.strip()
             
-            # Remove citation tags that break JSON
-            raw_text = re.sub(r'\[cite:\[.*?\]\]', '', raw_text, flags=re.DOTALL)
-            raw_text = re.sub(r'\[cite:.*?\]', '', raw_text)
-            
-            # Remove any markdown code blocks (more aggressive)
-            raw_text = re.sub(r'```json\s*', '', raw_text)
-            raw_text = re.sub(r'```\s*', '', raw_text)
+            # Remove citation tags and markdown code fences that break JSON
+            raw_text = _CITE_AND_FENCE_RE.sub('', raw_text)
             
-            # Remove any text before the first [ or {
-            match = re.search(r'^[^\[\{]*?([\[\{])', raw_text, re.DOTALL)
+            # Remove any text before the first [ or { and after the last ] or }
+            match = _BRACKET_SPAN_RE.search(raw_text)
             if match:
-                raw_text = raw_text[match.start(1):]
-            
-            # Remove any text after the last ] or }
-            last_bracket = max(raw_text.rfind(']'), raw_text.rfind('}'))
-            if last_bracket != -1:
-                raw_text = raw_text[:last_bracket + 1]
+                raw_text = match.group(0)
             
             # Clean the JSON string
             raw_text = clean_json_string(raw_text)
@@ -454,317 +755,84 @@ def extract_from_gemini(url: str, retries: int = 3, backoff: float = 2.0) -> Opt
             if not raw_text.startswith(('[', '{')):
                 logging.warning(f"Response doesn't start with [ or {{, attempting to extract JSON...")
                 # Try one more time to find JSON
-                match = re.search(r'([\[\{].*[\]\}])', raw_text, re.DOTALL)
+                match = _BRACKET_SPAN_RE.search(raw_text)
                 if match:
-                    raw_text = match.group(1)
-            
-            # Create a clean, readable filename from the URL
-            # Extract domain and path parts
-            url_parts = url.replace('https://', '').replace('http://', '').split('/')
-            domain = url_parts[0].replace('www.', '')
-            path_parts = [p for p in url_parts[1:] if p and p not in ['funding', 'grants', 'programs', 'application']]
-            
-            # Take last 2-3 meaningful parts of the path
-            meaningful_parts = path_parts[-3:] if len(path_parts) >= 3 else path_parts
-            
-            # Create clean filename
-            if meaningful_parts:
-                safe_name = '-'.join(meaningful_parts)
-            else:
-                safe_name = domain.split('.')[0]  # Use first part of domain if no path
-            
-            # Clean the name
-            safe_name = re.sub(r'[^\w\-]', '-', safe_name)
-            safe_name = re.sub(r'-+', '-', safe_name)  # Replace multiple dashes with single
-            safe_name = safe_name.strip('-')[:80]  # Limit length and remove trailing dashes
-            
-            # Add date
-            date_str = datetime.now(UTC).strftime('%Y-%m-%d')
-            debug_file = os.path.join(DATA_DIR, f"{safe_name}_{date_str}.json")
-            
-            # If file exists, add a counter
-            counter = 1
-            while os.path.exists(debug_file):
-                debug_file = os.path.join(DATA_DIR, f"{safe_name}_{date_str}_{counter}.json")
-                counter += 1
-            
-            with open(debug_file, "w", encoding="utf-8") as f:
-                f.write(raw_text)
-            logging.info(f"Raw response saved to {debug_file}")
+                    raw_text = match.group(0)
             
+            if DEBUG_SAVE:
+                debug_file = _debug_filename(url)
+                with open(debug_file, "wb", buffering=1 << 20) as f:
+                    f.write(raw_text.encode("utf-8"))
+                logging.info(f"Raw response saved to {debug_file}")
+
+            llm_cache.set(cache_key, raw_text)
             return raw_text
         
         except Exception as e:
             wait = backoff * (2 ** (attempt - 1)) + random.uniform(0, 1)
             logging.warning(f"Gemini request failed: {e}. Retrying in {wait:.1f}s...")
-            time.sleep(wait)
+            await asyncio.sleep(wait)
             
     logging.error(f"All attempts failed for: {url}")
     return None
 
 
-def validate_enum(value: str, valid_values: List[str], field_name: str) -> str:
+def validate_enum(value: str, valid_values: FrozenSet[str], field_name: str) -> str:
     """Validate single enum value"""
     if not value:
         return None
-    if value.upper() in valid_values:
-        return value.upper()
+    value_upper = value.upper()
+    if value_upper in valid_values:
+        return _CANONICAL.get(value_upper, value_upper)
     logging.warning(f"Invalid {field_name}: {value}. Setting to None/default.")
     return None
 
 
-def validate_enum_array(values: List[str], valid_values: List[str], field_name: str) -> List[str]:
+def validate_enum_array(values: List[str], valid_values: FrozenSet[str], field_name: str) -> List[str]:
     """Validate array of enum values with smart mapping"""
     if not values:
         return []
     
-    # Mapping dictionaries for common variations
-    sector_mappings = {
-        # Health/Medical/Life Sciences
-        "HEALTHCARE": "HEALTH",
-        "HEALTHCARE TECHNOLOGY": "HEALTH",
-        "DIGITAL HEALTH": "HEALTH",
-        "MEDICAL DEVICES": "HEALTH",
-        "DIAGNOSTICS": "HEALTH",
-        "THERAPEUTICS": "HEALTH",
-        "HEALTH TECHNOLOGY": "HEALTH",
-        "BIOMARKERS": "HEALTH",
-        "MEDICAL TECHNOLOGY": "HEALTH",
-        "HEALTHTECH": "HEALTH",
-        "MEDTECH": "HEALTH",
-        "VIRTUAL CARE": "HEALTH",
-        "PRECISION HEALTH": "HEALTH",
-        "REGENERATIVE MEDICINE": "HEALTH",
-        "ADVANCED MEDICAL IMAGING": "HEALTH",
-        "PERSONALIZED MEDICINE": "HEALTH",
-        "PUBLIC HEALTH": "HEALTH",
-        "HEALTH SYSTEM INNOVATION": "HEALTH",
-        "BIOTECH": "HEALTH",
-        "BIOTECHNOLOGY": "HEALTH",
-        "PHARMA": "HEALTH",
-        "PHARMACEUTICAL": "HEALTH",
-        "LIFE SCIENCES": "HEALTH",
-        "LIFE_SCIENCES": "HEALTH",
-        "HEALTH SCIENCES": "HEALTH",
-        # Technology/Digital
-        "ARTIFICIAL INTELLIGENCE": "TECHNOLOGY",
-        "MACHINE LEARNING": "TECHNOLOGY",
-        "DATA ANALYTICS": "TECHNOLOGY",
-        "REMOTE MONITORING": "TECHNOLOGY",
-        "ROBOTICS": "TECHNOLOGY",
-        "AUTOMATION": "TECHNOLOGY",
-        "SOFTWARE": "TECHNOLOGY",
-        "IT": "TECHNOLOGY",
-        "INFORMATION TECHNOLOGY": "TECHNOLOGY",
-        "INFORMATION_TECHNOLOGY": "TECHNOLOGY",
-        "INFORMATION AND COMMUNICATIONS TECHNOLOGY (ICT)": "TECHNOLOGY",
-        "ICT": "TECHNOLOGY",
-        "DIGITAL ECONOMY": "TECHNOLOGY",
-        "DIGITAL TECHNOLOGIES": "TECHNOLOGY",
-        "DEEP TECH": "TECHNOLOGY",
-        "INNOVATION": "TECHNOLOGY",
-        "CLIMATE TECH": "ENERGY",
-        # Energy/CleanTech
-        "CLEANTECH": "ENERGY",
-        "CLEAN TECHNOLOGY": "ENERGY",
-        "CLEAN GROWTH": "ENERGY",
-        # Agriculture/Food
-        "AGTECH": "AGRICULTURE",
-        "AGRI-FOOD": "AGRICULTURE",
-        "AGRI_FOOD": "AGRICULTURE",
-        # Finance
-        "FINTECH": "FINANCE",
-        # Education
-        "EDTECH": "EDUCATION",
-        # Arts & Culture
-        "ARTS": "CREATIVE",
-        "CULTURE": "CREATIVE",
-        "ARTS AND CULTURE": "CREATIVE",
-        "PERFORMING ARTS": "CREATIVE",
-        "VISUAL ARTS": "CREATIVE",
-        "LITERARY ARTS": "CREATIVE",
-        "MEDIA ARTS": "CREATIVE",
-        "CRAFT": "CREATIVE",
-        "DESIGN": "CREATIVE",
-        "COMMUNITY ARTS": "CREATIVE",
-        "CREATIVE INDUSTRIES": "CREATIVE",
-        "CREATIVE ARTS": "CREATIVE",
-        "CULTURAL INDUSTRIES": "CREATIVE",
-        # Hospitality/Tourism
-        "TOURISM": "HOSPITALITY",
-        # Manufacturing/Materials
-        "ADVANCED MATERIALS": "MANUFACTURING",
-        "ADVANCED MANUFACTURING": "MANUFACTURING",
-        "AUTOMOTIVE": "MANUFACTURING",
-        "AEROSPACE": "MANUFACTURING",
-        "STEEL": "MANUFACTURING",
-        # Transportation
-        "TRANSPORTATION": "TRANSPORTATION",
-        # Science/Research/Academia
-        "SCIENCE": "TECHNOLOGY",
-        "ENGINEERING": "TECHNOLOGY",
-        "SOCIAL SCIENCES": "SOCIAL_SERVICES",
-        "HUMANITIES": "EDUCATION",
-        # Social Impact
-        "SOCIAL IMPACT": "SOCIAL_SERVICES",
-        # Business/General
-        "EXPORT-ORIENTED BUSINESSES": "OPEN_TO_ALL",
-        "GENERAL BUSINESS INNOVATION": "OPEN_TO_ALL",
-        "GENERAL BUSINESS": "OPEN_TO_ALL",
-        "ECONOMIC DIVERSIFICATION": "OPEN_TO_ALL",
-        "OTHER PRIORITY SECTORS": "OPEN_TO_ALL",
-        "ALL_SECTORS": "OPEN_TO_ALL",
-    }
-    
-    purpose_mappings = {
-        # Research & Development
-        "INNOVATION": "RESEARCH",
-        "RESEARCH_AND_DEVELOPMENT": "RESEARCH",
-        "R&D": "RESEARCH",
-        "RESEARCH & DEVELOPMENT": "RESEARCH",
-        "VALIDATION": "RESEARCH",
-        "CLINICAL_TRIALS": "RESEARCH",
-        "PROOF_OF_CONCEPT": "RESEARCH",
-        # Product Development
-        "COMMERCIALIZATION": "PRODUCT_DEVELOPMENT",
-        "PROTOTYPING": "PRODUCT_DEVELOPMENT",
-        "PRODUCT DEVELOPMENT": "PRODUCT_DEVELOPMENT",
-        "PRODUCT_DEVELOPMENT": "PRODUCT_DEVELOPMENT",
-        # Business Growth & Operations
-        "BUSINESS_GROWTH": "OPERATIONAL",
-        "BUSINESS GROWTH": "OPERATIONAL",
-        "OPERATING SUPPORT": "OPERATIONAL",
-        "PROGRAM DELIVERY": "OPERATIONAL",
-        "BUSINESS_DEVELOPMENT": "OPERATIONAL",
-        "BUSINESS DEVELOPMENT": "OPERATIONAL",
-        "PRODUCTIVITY IMPROVEMENT": "OPERATIONAL",
-        "ECONOMIC DEVELOPMENT": "OPERATIONAL",
-        "ECONOMIC_DEVELOPMENT": "OPERATIONAL",
-        "VENTURE CREATION": "OPERATIONAL",
-        "STARTUP FUNDING": "CAPITAL",
-        # Expansion & Scaling
-        "PILOT_PROJECTS": "RESEARCH",
-        "SCALING_UP": "PROGRAM_EXPANSION",
-        "SCALE_UP": "PROGRAM_EXPANSION",
-        "EXPANSION": "PROGRAM_EXPANSION",
-        "BUSINESS_EXPANSION": "PROGRAM_EXPANSION",
-        "MARKET_EXPANSION": "MARKETING",
-        "MARKET EXPANSION": "MARKETING",
-        "MARKET ENTRY & EXPANSION": "MARKETING",
-        "MARKET ENTRY": "MARKETING",
-        "EXPORT_DEVELOPMENT": "MARKETING",
-        "EXPORT DEVELOPMENT": "MARKETING",
-        # Capacity & Training
-        "HEALTH_SYSTEM_IMPROVEMENT": "CAPACITY_BUILDING",
-        "CAPACITY BUILDING": "CAPACITY_BUILDING",
-        "CAPACITY_BUILDING": "CAPACITY_BUILDING",
-        "PROFESSIONAL DEVELOPMENT": "TRAINING",
-        "TALENT DEVELOPMENT": "TRAINING",
-        "TRAINING_AND_SKILLS_DEVELOPMENT": "TRAINING",
-        # Technology & Digital
-        "TECHNOLOGY_ADOPTION": "TECHNOLOGY",
-        "TECH_ADOPTION": "TECHNOLOGY",
-        "DIGITAL_ADOPTION": "TECHNOLOGY",
-        "TECHNOLOGY ADOPTION": "TECHNOLOGY",
-        # Marketing & Market Access
-        "MARKET_ACCESS": "MARKETING",
-        "MARKET ACCESS": "MARKETING",
-        # Community & Engagement
-        "ARTS AND CULTURE": "COMMUNITY_ENGAGEMENT",
-        "COMMUNITY DEVELOPMENT": "COMMUNITY_ENGAGEMENT",
-        # Job Creation
-        "JOB CREATION": "HIRING",
-        "JOB_CREATION": "HIRING",
-        # Economic Growth
-        "ECONOMIC GROWTH": "OPERATIONAL",
-        "GLOBAL COMPETITIVENESS": "OPERATIONAL",
-    }
-    
-    equity_mappings = {
-        # Black/BIPOC/Racialized
-        "BLACK-LED": "BIPOC_LED",
-        "BLACK LED": "BIPOC_LED",
-        "BLACK": "BIPOC_LED",
-        "RACIALIZED COMMUNITIES": "BIPOC_LED",
-        "RACIALIZED GROUPS": "BIPOC_LED",
-        "VISIBLE_MINORITY": "BIPOC_LED",
-        "VISIBLE MINORITY": "BIPOC_LED",
-        "MINORITY": "MINORITY_LED",
-        "MINORITY-LED": "MINORITY_LED",
-        "MINORITY LED": "MINORITY_LED",
-        # Indigenous
-        "INDIGENOUS": "INDIGENOUS",
-        "INDIGENOUS_PEOPLE": "INDIGENOUS",
-        "INDIGENOUS PEOPLE": "INDIGENOUS",
-        # Women
-        "WOMEN-LED": "WOMEN_LED",
-        "WOMEN LED": "WOMEN_LED",
-        "WOMEN": "WOMEN_LED",
-        # LGBTQ+
-        "LGBTQ": "LGBTQ_PLUS",
-        "LGBTQ+": "LGBTQ_PLUS",
-        "LGBTQ2S+": "LGBTQ_PLUS",
-        "LGBTQ2S": "LGBTQ_PLUS",
-        # Disability
-        "DISABLED": "DISABLED",
-        "DISABILITY": "DISABLED",
-        "PEOPLE_WITH_DISABILITIES": "DISABLED",
-        "PEOPLE WITH DISABILITIES": "DISABLED",
-        # Geographic
-        "RURAL": "RURAL",
-        "URBAN": "URBAN",
-        "REMOTE": "REMOTE",
-        # Age
-        "YOUTH": "YOUTH",
-        "SENIOR": "SENIOR",
-        "SENIORS": "SENIOR",
-        # Immigration/Refugee
-        "IMMIGRANT": "IMMIGRANT",
-        "IMMIGRANTS": "IMMIGRANT",
-        "REFUGEE": "REFUGEE",
-        "REFUGEES": "REFUGEE",
-        # Veterans
-        "VETERAN": "VETERAN",
-        "VETERANS": "VETERAN",
-        # Economic
-        "LOW-INCOME": "LOW_INCOME",
-        "LOW INCOME": "LOW_INCOME",
-        "UNDERSERVED": "UNDERSERVED",
-    }
+    # Fast path: every value is already an exact enum value
+    if all(isinstance(val, str) and val in valid_values for val in values):
+        return [_CANONICAL.get(val, val) for val in dict.fromkeys(values)]
     
-    # Choose the right mapping based on field name
-    mappings = {}
-    if "sector" in field_name.lower():
-        mappings = sector_mappings
-    elif "purpose" in field_name.lower():
-        mappings = purpose_mappings
-    elif "equity" in field_name.lower():
-        mappings = equity_mappings
+    # Choose the right lookup based on field name
+    lookup = _LOOKUP_BY_FIELD.get(field_name)
+    if lookup is None:
+        lookup = _identity_lookup(valid_values)
     
     validated = []
     seen = set()  # Track what we've added to avoid duplicates
     
     for val in values:
         val_upper = str(val).upper().strip()
+        mapped = lookup.get(val_upper)
         
-        # First check if it's already a valid enum
-        if val_upper in valid_values:
-            if val_upper not in seen:
-                validated.append(val_upper)
-                seen.add(val_upper)
-        # Then check if we have a mapping for it
-        elif val_upper in mappings:
-            mapped = mappings[val_upper]
-            if mapped not in seen:
-                validated.append(mapped)
-                seen.add(mapped)
-                logging.info(f"Mapped {field_name} value '{val}' to '{mapped}'")
-        else:
+        if mapped is None:
             logging.warning(f"Invalid {field_name} value: {val}. Skipping.")
+        elif mapped not in seen:
+            validated.append(mapped)
+            seen.add(mapped)
+            if mapped != val_upper:
+                logging.debug(f"Mapped {field_name} value '{val}' to '{mapped}'")
     
     return validated
 
 
+# Every enum field as (section, field, valid values, is_array); section None means top level
+_ENUM_FIELDS = (
+    (None, "funderType", VALID_FUNDER_TYPES, False),
+    ("eligibility", "eligibleSectors", VALID_SECTORS, True),
+    ("eligibility", "organizationType", VALID_APPLICANT_TYPES, True),
+    ("eligibility", "businessStage", VALID_BUSINESS_STAGES, False),
+    ("eligibility", "revenueRange", VALID_REVENUE_RANGES, False),
+    ("eligibility", "employeeRange", VALID_EMPLOYEE_RANGES, False),
+    ("eligibility", "equityFocus", VALID_EQUITY_FOCUS, True),
+    ("eligibility", "grantPurpose", VALID_GRANT_PURPOSE, True),
+    ("fundingStructure", "fundingType", VALID_FUNDING_TYPES, False),
+)
+
 def parse_and_validate(raw_json: str, source_url: str) -> tuple:
     """
     Parse Gemini's JSON response and validate each record with enum checking.
@@ -777,106 +845,26 @@ def parse_and_validate(raw_json: str, source_url: str) -> tuple:
         return valid_records, invalid_records
 
     try:
-        parsed = json.loads(raw_json)
+        try:
+            parsed = orjson.loads(raw_json)
+        except orjson.JSONDecodeError:
+            # orjson rejects raw newlines inside strings; the stdlib decoder accepts them in non-strict mode
+            parsed = json.loads(raw_json, strict=False)
     except json.JSONDecodeError as e:
         logging.error(f"JSON parsing error for {source_url}: {e}")
         logging.error(f"Raw JSON preview (first 500 chars): {raw_json[:500]}")
         logging.error(f"Raw JSON preview (around error): {raw_json[max(0, e.pos-100):min(len(raw_json), e.pos+100)]}")
         
-        # Try multiple auto-fix strategies
-        fixed = False
-        parsed = None
-        
-        # Strategy 1: Fix missing commas between string values and property names
-        if not fixed:
-            try:
-                # Add comma between }" and next property name
-                fixed_json = re.sub(r'"\s*([a-zA-Z_])', r'", \1', raw_json)
-                # Also fix closing quote followed by property name without comma
-                fixed_json = re.sub(r'([0-9])\s*"([a-zA-Z_])', r'\1, "\2', fixed_json)
-                parsed = json.loads(fixed_json)
-                logging.info("Successfully parsed JSON after adding missing commas (strategy 1)")
-                fixed = True
-            except Exception as ex:
-                logging.debug(f"Strategy 1 failed: {ex}")
-        
-        # Strategy 2: Fix unescaped newlines in strings
-        if not fixed:
-            try:
-                fixed_json = re.sub(r'(?<!\\)\n(?=[^,\[\]\{\}:])', ' ', raw_json)
-                parsed = json.loads(fixed_json)
-                logging.info("Successfully parsed JSON after fixing newlines (strategy 2)")
-                fixed = True
-            except Exception as ex:
-                logging.debug(f"Strategy 2 failed: {ex}")
-        
-        # Strategy 3: More aggressive - remove all newlines except between elements
-        if not fixed:
-            try:
-                # This removes newlines that aren't followed by whitespace and a structural character
-                fixed_json = re.sub(r'\n(?!\s*[,\[\]\{\}"])', ' ', raw_json)
-                parsed = json.loads(fixed_json)
-                logging.info("Successfully parsed JSON after aggressive newline removal (strategy 3)")
-                fixed = True
-            except Exception as ex:
-                logging.debug(f"Strategy 3 failed: {ex}")
-        
-        # Strategy 4: Try to find and extract just the first complete JSON object/array
-        if not fixed:
-            try:
-                # Find the first [ or {
-                start = raw_json.find('[')
-                if start == -1:
-                    start = raw_json.find('{')
-                
-                if start != -1:
-                    # Try to balance brackets
-                    depth = 0
-                    in_string = False
-                    escape_next = False
-                    
-                    for i in range(start, len(raw_json)):
-                        char = raw_json[i]
-                        
-                        if escape_next:
-                            escape_next = False
-                            continue
-                            
-                        if char == '\\':
-                            escape_next = True
-                            continue
-                            
-                        if char == '"':
-                            in_string = not in_string
-                            continue
-                        
-                        if not in_string:
-                            if char in '[{':
-                                depth += 1
-                            elif char in ']}':
-                                depth -= 1
-                                if depth == 0:
-                                    # Found the end
-                                    fixed_json = raw_json[start:i+1]
-                                    parsed = json.loads(fixed_json)
-                                    logging.info("Successfully extracted and parsed complete JSON structure (strategy 4)")
-                                    fixed = True
-                                    break
-            except Exception as ex:
-                logging.debug(f"Strategy 4 failed: {ex}")
-        
-        # Strategy 5: Fix quoted values that break across lines
-        if not fixed:
-            try:
-                # Look for pattern: "some text (more text without closing quote on new line
-                fixed_json = re.sub(r'"\s*\n\s*([^"{\[\]},]+)\s*"', r'", "\1"', raw_json)
-                parsed = json.loads(fixed_json)
-                logging.info("Successfully parsed JSON after fixing multi-line strings (strategy 5)")
-                fixed = True
-            except Exception as ex:
-                logging.debug(f"Strategy 5 failed: {ex}")
+        # Single tolerant pass: missing commas, raw newlines, unclosed strings, trailing text...
+        try:
+            parsed = repair_json(raw_json, return_objects=True)
+        except Exception as ex:
+            logging.debug(f"JSON repair failed: {ex}")
+            parsed = None
         
-        if not fixed:
+        if parsed:
+            logging.info("Successfully parsed JSON after repair")
+        else:
             logging.error("Could not auto-fix JSON. Saving to error file for manual review.")
             error_file = os.path.join(DATA_DIR, f"json_error_{int(time.time())}.txt")
             with open(error_file, "w", encoding="utf-8") as f:
@@ -902,6 +890,7 @@ def parse_and_validate(raw_json: str, source_url: str) -> tuple:
         logging.warning(f"Unexpected JSON structure for {source_url}")
         return valid_records, invalid_records
 
+    year = datetime.now().year  # shared by every generated grantID in this batch
     for item in parsed:
         try:
             # Add source URL
@@ -909,169 +898,137 @@ def parse_and_validate(raw_json: str, source_url: str) -> tuple:
             
             # Auto-generate grant_id if missing
             if not item.get("grantID"):
-                funder_base = (item.get("funderName") or "UNKNOWN").replace(" ", "_").upper()[:10]
-                item["grantID"] = f"GRANT-{datetime.now().year}-{int(time.time())}_{random.randint(100,999)}"
+                item["grantID"] = f"GRANT-{year}-{uuid.uuid4().hex[:12]}"
             
-            # Validate core enums
-            item["funderType"] = validate_enum(item.get("funderType"), VALID_FUNDER_TYPES, "funderType")
             item["programStatus"] = item.get("programStatus", "ACTIVE")
             
-            # Validate eligibility enums
-            if "eligibility" in item:
-                elig = item["eligibility"]
-                elig["eligibleSectors"] = validate_enum_array(
-                    elig.get("eligibleSectors", []), VALID_SECTORS, "eligibleSectors"
-                )
-                elig["organizationType"] = validate_enum_array(
-                    elig.get("organizationType", []), VALID_APPLICANT_TYPES, "organizationType"
-                )
-                elig["businessStage"] = validate_enum(
-                    elig.get("businessStage"), VALID_BUSINESS_STAGES, "businessStage"
-                )
-                elig["revenueRange"] = validate_enum(
-                    elig.get("revenueRange"), VALID_REVENUE_RANGES, "revenueRange"
-                )
-                elig["employeeRange"] = validate_enum(
-                    elig.get("employeeRange"), VALID_EMPLOYEE_RANGES, "employeeRange"
-                )
-                elig["equityFocus"] = validate_enum_array(
-                    elig.get("equityFocus", []), VALID_EQUITY_FOCUS, "equityFocus"
-                )
-                elig["grantPurpose"] = validate_enum_array(
-                    elig.get("grantPurpose", []), VALID_GRANT_PURPOSE, "grantPurpose"
-                )
-            
-            # Validate funding structure enums
-            if "fundingStructure" in item:
-                fund = item["fundingStructure"]
-                fund["fundingType"] = validate_enum(
-                    fund.get("fundingType"), VALID_FUNDING_TYPES, "fundingType"
-                )
+            # Validate every enum field in one pass over the record
+            for section, field, valid_values, is_array in _ENUM_FIELDS:
+                if section is None:
+                    target = item
+                elif section in item:
+                    target = item[section]
+                else:
+                    continue
+                if is_array:
+                    target[field] = validate_enum_array(target.get(field, []), valid_values, field)
+                else:
+                    target[field] = validate_enum(target.get(field), valid_values, field)
             
             valid_records.append(item)
             
         except Exception as e:
             logging.warning(f"Validation failed for {source_url} (ID: {item.get('grantID', 'N/A')}): {e}")
-            invalid_records.append({"source_url": source_url, "error": str(e), "data_preview": str(item)[:200]})
+            invalid_records.append({"source_url": source_url, "error": str(e), "data_preview": orjson.dumps(item)[:200].decode("utf-8", "ignore")})
 
     return valid_records, invalid_records
 
 
-def flatten_grant_structure(grant: dict) -> dict:
-    """
-    Flatten nested grant structure into flat CSV format with proper prefixes
-    """
-    flat = {
-        # Core Grant fields
-        "grantID": grant.get("grantID", ""),
-        "programName": grant.get("programName", ""),
-        "programDescription": grant.get("programDescription", ""),
-        "funderName": grant.get("funderName", ""),
-        "funderType": grant.get("funderType", ""),
-        "programURL": grant.get("programURL", ""),
-        "sourceType": grant.get("sourceType", "MANUAL_ENTRY"),
-        "sourceURL": grant.get("sourceURL", ""),
-        "programStatus": grant.get("programStatus", "ACTIVE"),
-        "currency": grant.get("currency", "CAD"),
-    }
-    
+# Flattened CSV layout as (column, section, default, is_list); section None means top level.
+# List fields are joined with "; ".
+_FLAT_SCHEMA = (
+    # Core Grant fields
+    ("grantID", None, "", False),
+    ("programName", None, "", False),
+    ("programDescription", None, "", False),
+    ("funderName", None, "", False),
+    ("funderType", None, "", False),
+    ("programURL", None, "", False),
+    ("sourceType", None, "MANUAL_ENTRY", False),
+    ("sourceURL", None, "", False),
+    ("programStatus", None, "ACTIVE", False),
+    ("currency", None, "CAD", False),
     # Eligibility fields
-    elig = grant.get("eligibility", {})
-    flat.update({
-        "eligibleSectors": "; ".join(elig.get("eligibleSectors", [])),
-        "eligibleGeographies": "; ".join(elig.get("eligibleGeographies", [])),
-        "businessStage": elig.get("businessStage", ""),
-        "organizationType": "; ".join(elig.get("organizationType", [])),
-        "revenueRange": elig.get("revenueRange", ""),
-        "employeeRange": elig.get("employeeRange", ""),
-        "eligibleActivities": "; ".join(elig.get("eligibleActivities", [])),
-        "ineligibleActivities": "; ".join(elig.get("ineligibleActivities", [])),
-        "equityFocus": "; ".join(elig.get("equityFocus", [])),
-        "grantPurpose": "; ".join(elig.get("grantPurpose", [])),
-        "eligibilityNotes": elig.get("eligibilityNotes", ""),
-        "additionalEligibilityCriteria": elig.get("additionalEligibilityCriteria", ""),
-    })
-    
+    ("eligibleSectors", "eligibility", [], True),
+    ("eligibleGeographies", "eligibility", [], True),
+    ("businessStage", "eligibility", "", False),
+    ("organizationType", "eligibility", [], True),
+    ("revenueRange", "eligibility", "", False),
+    ("employeeRange", "eligibility", "", False),
+    ("eligibleActivities", "eligibility", [], True),
+    ("ineligibleActivities", "eligibility", [], True),
+    ("equityFocus", "eligibility", [], True),
+    ("grantPurpose", "eligibility", [], True),
+    ("eligibilityNotes", "eligibility", "", False),
+    ("additionalEligibilityCriteria", "eligibility", "", False),
     # Funding Structure fields
-    fund = grant.get("fundingStructure", {})
-    flat.update({
-        "fundingType": fund.get("fundingType", ""),
-        "amountMin": fund.get("amountMin", ""),
-        "amountMax": fund.get("amountMax", ""),
-        "fixedAmount": fund.get("fixedAmount", ""),
-        "ratePercentage": fund.get("ratePercentage", ""),
-        "matchRequired": fund.get("matchRequired", False),
-        "matchPercentage": fund.get("matchPercentage", ""),
-        "nonRepayable": fund.get("nonRepayable", True),
-        "repaymentTerms": fund.get("repaymentTerms", ""),
-        "advancePayment": fund.get("advancePayment", False),
-        "reimbursementFrequency": fund.get("reimbursementFrequency", ""),
-        "eligibleExpenseCategories": "; ".join(fund.get("eligibleExpenseCategories", [])),
-    })
-    
+    ("fundingType", "fundingStructure", "", False),
+    ("amountMin", "fundingStructure", "", False),
+    ("amountMax", "fundingStructure", "", False),
+    ("fixedAmount", "fundingStructure", "", False),
+    ("ratePercentage", "fundingStructure", "", False),
+    ("matchRequired", "fundingStructure", False, False),
+    ("matchPercentage", "fundingStructure", "", False),
+    ("nonRepayable", "fundingStructure", True, False),
+    ("repaymentTerms", "fundingStructure", "", False),
+    ("advancePayment", "fundingStructure", False, False),
+    ("reimbursementFrequency", "fundingStructure", "", False),
+    ("eligibleExpenseCategories", "fundingStructure", [], True),
     # Deadlines fields
-    dead = grant.get("deadlines", {})
-    flat.update({
-        "applicationOpenDate": dead.get("applicationOpenDate", ""),
-        "applicationCloseDate": dead.get("applicationCloseDate", ""),
-        "rollingDeadlineFlag": dead.get("rollingDeadlineFlag", False),
-        "loidDeadline": dead.get("loidDeadline", ""),
-        "decisionDate": dead.get("decisionDate", ""),
-        "awardStartDate": dead.get("awardStartDate", ""),
-        "awardEndDate": dead.get("awardEndDate", ""),
-        "renewalDeadline": dead.get("renewalDeadline", ""),
-        "reportingFrequency": dead.get("reportingFrequency", ""),
-        "keyMilestones": dead.get("keyMilestones", ""),
-    })
-    
+    ("applicationOpenDate", "deadlines", "", False),
+    ("applicationCloseDate", "deadlines", "", False),
+    ("rollingDeadlineFlag", "deadlines", False, False),
+    ("loidDeadline", "deadlines", "", False),
+    ("decisionDate", "deadlines", "", False),
+    ("awardStartDate", "deadlines", "", False),
+    ("awardEndDate", "deadlines", "", False),
+    ("renewalDeadline", "deadlines", "", False),
+    ("reportingFrequency", "deadlines", "", False),
+    ("keyMilestones", "deadlines", "", False),
     # Documentation fields
-    doc = grant.get("documentation", {})
-    flat.update({
-        "businessPlanRequired": doc.get("businessPlanRequired", False),
-        "financialStatementsRequired": doc.get("financialStatementsRequired", False),
-        "taxReturnsRequired": doc.get("taxReturnsRequired", False),
-        "incorporationDocumentsRequired": doc.get("incorporationDocumentsRequired", False),
-        "lettersOfSupportRequired": doc.get("lettersOfSupportRequired", False),
-        "researchProposalRequired": doc.get("researchProposalRequired", False),
-        "impactAssessmentRequired": doc.get("impactAssessmentRequired", False),
-        "additionalDocuments": "; ".join(doc.get("additionalDocuments", [])),
-    })
-    
+    ("businessPlanRequired", "documentation", False, False),
+    ("financialStatementsRequired", "documentation", False, False),
+    ("taxReturnsRequired", "documentation", False, False),
+    ("incorporationDocumentsRequired", "documentation", False, False),
+    ("lettersOfSupportRequired", "documentation", False, False),
+    ("researchProposalRequired", "documentation", False, False),
+    ("impactAssessmentRequired", "documentation", False, False),
+    ("additionalDocuments", "documentation", [], True),
     # Compliance fields
-    comp = grant.get("compliance", {})
-    flat.update({
-        "reportingRequirements": comp.get("reportingRequirements", ""),
-        "auditRequirement": comp.get("auditRequirement", ""),
-        "siteVisitRequirement": comp.get("siteVisitRequirement", ""),
-        "dataCollectionRequirement": comp.get("dataCollectionRequirement", ""),
-        "ipRightsClauses": comp.get("ipRightsClauses", ""),
-        "publicityRequirement": comp.get("publicityRequirement", ""),
-        "complianceScoring": comp.get("complianceScoring", ""),
-    })
-    
+    ("reportingRequirements", "compliance", "", False),
+    ("auditRequirement", "compliance", "", False),
+    ("siteVisitRequirement", "compliance", "", False),
+    ("dataCollectionRequirement", "compliance", "", False),
+    ("ipRightsClauses", "compliance", "", False),
+    ("publicityRequirement", "compliance", "", False),
+    ("complianceScoring", "compliance", "", False),
     # Contact fields
-    cont = grant.get("contact", {})
-    flat.update({
-        "primaryContactName": cont.get("primaryContactName", ""),
-        "primaryContactEmail": cont.get("primaryContactEmail", ""),
-        "primaryContactPhone": cont.get("primaryContactPhone", ""),
-        "programManagerName": cont.get("programManagerName", ""),
-        "applicationPortalURL": cont.get("applicationPortalURL", ""),
-    })
-    
+    ("primaryContactName", "contact", "", False),
+    ("primaryContactEmail", "contact", "", False),
+    ("primaryContactPhone", "contact", "", False),
+    ("programManagerName", "contact", "", False),
+    ("applicationPortalURL", "contact", "", False),
     # Program Category fields
-    cat = grant.get("programCategory", {})
-    flat.update({
-        "sector": cat.get("sector", ""),
-        "theme": cat.get("theme", ""),
-        "pillar": cat.get("pillar", ""),
-        "stage": cat.get("stage", ""),
-        "ediPriority": cat.get("ediPriority", False),
-    })
-    
+    ("sector", "programCategory", "", False),
+    ("theme", "programCategory", "", False),
+    ("pillar", "programCategory", "", False),
+    ("stage", "programCategory", "", False),
+    ("ediPriority", "programCategory", False, False),
+)
+
+
+def flatten_grant_structure(grant: dict) -> dict:
+    """
+    Flatten nested grant structure into flat CSV format with proper prefixes
+    """
+    flat = {}
+    for column, section, default, is_list in _FLAT_SCHEMA:
+        source = grant if section is None else grant.get(section, {})
+        value = source.get(column, default)
+        flat[column] = "; ".join(value) if is_list else value
     return flat
 
 
+# Column order of the flattened CSV, fixed once at import
+CSV_COLUMNS = tuple(flatten_grant_structure({}))
+INVALID_COLUMNS = ("source_url", "error", "data_preview")
+
+
+# Boilerplate that marks a scraped description as generic, matched in one case-insensitive scan
+GENERIC_DESC_MARKERS = ("click here", "learn more")
+_GENERIC_DESC_RE = re.compile("|".join(map(re.escape, GENERIC_DESC_MARKERS)), re.I)
+
+
 def quality_check(grant: dict) -> bool:
     """
     Returns True if grant passes quality checks
@@ -1086,54 +1043,108 @@ def quality_check(grant: dict) -> bool:
         return False
     
     # Check description quality
-    desc = grant.get("programDescription", "").strip().lower()
-    if len(desc) < 100 or "click here" in desc or "learn more" in desc:
+    desc = grant.get("programDescription", "").strip()
+    if len(desc) < 100 or _GENERIC_DESC_RE.search(desc):
         return False
     
     return True
 
 
-def save_to_csv(valid_records: list, invalid_records: list):
+def write_csv(path: str, rows, fieldnames, append: bool = False):
     """
-    Saves validated grant data to CSV with flattened structure
+    Write dict rows in fieldnames order; every row must contain every column.
+    The header is written unless appending to an existing file.
+    """
+    write_header = not (append and os.path.exists(path))
+    with open(path, "a" if append else "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(fieldnames)
+        # itemgetter pulls each row's values in C instead of DictWriter's per-row generator
+        writer.writerows(map(operator.itemgetter(*fieldnames), rows))
+
+
+def save_to_csv(valid_records: list, invalid_records: list, already_flat: bool = False):
+    """
+    Saves validated grant data to CSV with flattened structure.
+    Pass already_flat=True when the records have been through flatten_grant_structure.
     """
     if not valid_records:
         logging.warning("No valid records to save.")
         return
 
-    # Flatten all records
-    flattened_records = [flatten_grant_structure(record) for record in valid_records]
-    df = pd.DataFrame(flattened_records)
-
     # Append to existing CSV if it exists, else create new
-    write_header = not os.path.exists(VALIDATED_CSV)
-    df.to_csv(VALIDATED_CSV, mode="a", header=write_header, index=False, encoding="utf-8")
+    rows = valid_records if already_flat else map(flatten_grant_structure, valid_records)
+    write_csv(VALIDATED_CSV, rows, CSV_COLUMNS, append=True)
     logging.info(f"Saved {len(valid_records)} validated records to {VALIDATED_CSV}")
 
+    # Record the saved URLs so the next run can skip them without re-reading any CSV
+    saved_urls = dict.fromkeys(r["sourceURL"] for r in valid_records if r.get("sourceURL"))
+    with open(PROCESSED_URLS_FILE, "a", encoding="utf-8") as f:
+        f.writelines(f"{url}\n" for url in saved_urls)
+
     # Save invalid records
     if invalid_records:
         invalid_path = os.path.join(DATA_DIR, f"invalid_records_{now_utc}.csv")
-        df_invalid = pd.DataFrame(invalid_records)
-        df_invalid.to_csv(invalid_path, mode="w", header=True, index=False)
+        write_csv(invalid_path, invalid_records, INVALID_COLUMNS)
         logging.warning(f"{len(invalid_records)} invalid records logged in {invalid_path}")
 
 
-def load_processed_urls():
+def append_raw_output(records: list):
+    """
+    Append parsed (pre-flattening) grant records to raw_output.jsonl, one JSON object per line
+    """
+    if not records:
+        return
+
+    with open(RAW_OUTPUT_DIR, "ab", buffering=1 << 20) as f:
+        f.writelines([orjson.dumps(record) + b"\n" for record in records])
+    logging.info(f"Appended {len(records)} parsed records to {RAW_OUTPUT_DIR}")
+
+
+def load_processed_urls(candidates: Optional[set] = None) -> set:
     """
     Load URLs that have already been successfully processed
+    With candidates, only those URLs are kept, so memory is bounded by the
+    source list rather than by the whole processing history.
     """
+    if os.path.exists(PROCESSED_URLS_FILE):
+        with open(PROCESSED_URLS_FILE, encoding="utf-8") as f:
+            urls = (line.rstrip("\n") for line in f)
+            return {url for url in urls if url and (candidates is None or url in candidates)}
+
+    # No sidecar yet (older data directory): fall back to scanning the CSV
     static_csv_name = os.path.join(DATA_DIR, "validated_grants.csv")
     if not os.path.exists(static_csv_name):
         return set()
 
     try:
-        df = pd.read_csv(static_csv_name, usecols=["sourceURL"], dtype={'sourceURL': str})
-        return set(df["sourceURL"].dropna().tolist())
+        # Stream just the sourceURL column into a set
+        with open(static_csv_name, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            idx = next(reader).index("sourceURL")
+            urls = (row[idx] for row in reader if len(row) > idx)
+            return {url for url in urls if url and (candidates is None or url in candidates)}
     except Exception as e:
         logging.error(f"Error loading processed URLs: {e}")
         return set()
 
 
+async def extract_all(urls: List[str]) -> list:
+    """
+    Run extraction for every URL concurrently, at most MAX_CONCURRENT_REQUESTS at a time.
+    Results come back in the same order as `urls`; failures are returned as exceptions.
+    Closes the async client when done, so call it once per run.
+    """
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    tasks = [extract_from_gemini_async(url, sem) for url in urls]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        # Release pooled connections while the event loop is still running
+        await client.aio.aclose()
+
+
 def run_pipeline():
     """
     Full end-to-end process with new schema structure
@@ -1143,59 +1154,70 @@ def run_pipeline():
         return
 
     all_valid, all_invalid = [], []
-    total = len(SOURCES)
-    processed = load_processed_urls()
-
-    logging.info(f"Starting batch extraction for {total} sources.")
+    # Duplicates in the source list would be extracted (and saved) twice
+    sources = list(dict.fromkeys(SOURCES))
+    processed = load_processed_urls(set(sources))
+    pending = [url for url in sources if url not in processed]
+
+    logging.info(f"Starting batch extraction for {len(sources)} sources.")
+    if len(sources) < len(SOURCES):
+        logging.info(f"Ignoring {len(SOURCES) - len(sources)} duplicate source URLs.")
     logging.info(f"Skipping {len(processed)} URLs already processed.")
 
-    for i, url in enumerate(SOURCES, start=1):
-        if url in processed:
-            logging.info(f"---- Skipping already processed: {url}")
-            continue
+    # Extract raw JSON from Gemini for all pending URLs concurrently
+    raw_results = asyncio.run(extract_all(pending))
 
-        logging.info(f"\n---- [{i}/{total}] Processing {url} ----")
+    responses, response_urls = [], []
+    for i, (url, raw) in enumerate(zip(pending, raw_results), start=1):
+        logging.info(f"\n---- [{i}/{len(pending)}] Processing {url} ----")
 
-        # Extract raw JSON from Gemini
-        raw = extract_from_gemini(url)
+        if isinstance(raw, Exception):
+            logging.error(f"Extraction raised for {url}: {raw}")
+            raw = None
         if not raw:
-            all_invalid.append({"source_url": url, "error": "Gemini extraction failed"})
+            all_invalid.append({"source_url": url, "error": "Gemini extraction failed", "data_preview": ""})
             continue
 
-        # Parse + validate
-        valid, invalid = parse_and_validate(raw, url)
+        responses.append(raw)
+        response_urls.append(url)
+
+    # Parse + validate in this process: responses are capped at MAX_TOKENS, so the work is small,
+    # and warnings logged while parsing go through the same buffered file handler as the rest of the run
+    results = [parse_and_validate(raw, url) for raw, url in zip(responses, response_urls)]
 
-        # Aggregate results
+    # Aggregate results
+    for valid, invalid in results:
         all_valid.extend(valid)
         all_invalid.extend(invalid)
 
-        time.sleep(2)  # Rate limit delay
+    append_raw_output(all_valid)
 
-    # Split between high-quality and manual-review grants
+    # Flatten each grant once and split between high-quality and manual-review rows
     high_quality, manual_review = [], []
 
     for grant in all_valid:
+        flat = flatten_grant_structure(grant)
         if quality_check(grant):
-            high_quality.append(grant)
+            high_quality.append(flat)
         else:
-            manual_review.append(grant)
+            manual_review.append(flat)
 
     # Save results
-    save_to_csv(high_quality, all_invalid)
+    save_to_csv(high_quality, all_invalid, already_flat=True)
 
     if manual_review:
         review_path = os.path.join(DATA_DIR, f"manual_review_{now_utc}.csv")
-        flattened_review = [flatten_grant_structure(r) for r in manual_review]
-        df_review = pd.DataFrame(flattened_review)
-        df_review.to_csv(review_path, mode="w", header=True, index=False, encoding="utf-8")
+        write_csv(review_path, manual_review, CSV_COLUMNS)
         logging.warning(f"{len(manual_review)} records moved to manual review at {review_path}")
 
     logging.info("=== Extraction Complete ===")
-    logging.info(f"Total URLs processed: {total - len(processed)}")
+    logging.info(f"Total URLs processed: {len(pending)}")
     logging.info(f"Valid grants: {len(all_valid)}")
     logging.info(f"High quality: {len(high_quality)}")
     logging.info(f"Manual review: {len(manual_review)}")
     logging.info(f"Invalid grants: {len(all_invalid)}")
+    cache_stats = llm_cache.stats()
+    logging.info(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
     logging.info(f"Output file: {VALIDATED_CSV}")
 
 
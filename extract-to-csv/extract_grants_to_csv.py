@@ -1,15 +1,27 @@
 import os
+import csv
+import operator
+import uuid
 import json
-import pandas as pd
-from pydantic import BaseModel, Field
+import orjson
+import re
+import math
+from pydantic import BaseModel, Field, ValidationError
 import logging
+import atexit
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from typing import Optional
 from datetime import datetime, UTC
 from dotenv import load_dotenv
 import time
-import random
+import asyncio
 from google import genai
-from schema import GrantData # Import the updated Pydantic model
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception, stop_any, stop_after_attempt, wait_exponential_jitter
+from schema import GrantData, GrantListAdapter, EnrichItem, EnrichListAdapter # Import the updated Pydantic model
+import llm_cache
+from rate_limit import AsyncTokenBucket, estimate_tokens
 from typing import Optional, List, Dict, Any # Added missing import
 
 ## ---1. CONFIGURATION
@@ -27,6 +39,7 @@ CONFIG_PATH = "config/sources_list.json"
 DATA_DIR = "data/processed"
 LOG = 'data/log'
 RAW_OUTPUT_DIR = os.path.join(DATA_DIR, "raw_output.jsonl")
+PROCESSED_URLS_FILE = os.path.join(DATA_DIR, "processed_urls.txt")   # one URL per line, appended on save
 
 # Using UTC time for robust timestamping (addresses DeprecationWarning)
 now_utc = datetime.now(UTC).strftime('%Y-%m-%d_%H-%M-%S')
@@ -38,22 +51,25 @@ os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(LOG, exist_ok=True)
 
 
-# configure logging
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-)
-# Stream to console too
-logging.getLogger().addHandler(logging.StreamHandler())
+# configure logging: log calls only enqueue the record; a listener thread formats it and
+# writes to the file and the console, so the event loop never waits on log I/O
+_log_file_handler = logging.FileHandler(LOG_FILE)
+_log_file_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+_log_queue = queue.SimpleQueue()
+log_listener = QueueListener(_log_queue, _log_file_handler, logging.StreamHandler())
+log_listener.start()
+atexit.register(log_listener.stop)  # drain the queue before the interpreter exits
+_log_queue_handler = QueueHandler(_log_queue)
+_log_queue_handler.setFormatter(logging.Formatter("%(message)s"))  # the listener's handlers add the timestamp
+logging.basicConfig(level=logging.INFO, handlers=[_log_queue_handler])
 
 logging.info("=== GRANT EXTRACTION PIPELINE INITIALIZED ===")
 
 
 #load sources
 try:
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        SOURCES = json.load(f).get("sources", [])
+    with open(CONFIG_PATH, "rb") as f:
+        SOURCES = orjson.loads(f.read()).get("sources", [])
         logging.info(f"Loaded {len(SOURCES)} sources from {CONFIG_PATH}")
 except FileNotFoundError:
     logging.error(f"Sources file not found at {CONFIG_PATH}. Please ensure '{CONFIG_PATH}' exists.")
@@ -64,15 +80,120 @@ if not SOURCES:
 
 
 # Initialize Gemini Client
-client = genai.Client(api_key=API_KEY)
+# One pooled httpx transport for every async call, so TLS connections are reused across URLs
+# (passing a transport also keeps genai on httpx rather than aiohttp)
+client = genai.Client(
+    api_key=API_KEY,
+    http_options=genai.types.HttpOptions(
+        async_client_args={
+            "transport": httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+            )
+        },
+    ),
+)
 MODEL_NAME = "gemini-2.5-flash" 
 TEMPERATURE = 0.3              
 MAX_TOKENS = 4096 
+EMBEDDING_MODEL = "text-embedding-004"   # compares a grant's description with its previous wording
+ENRICH_SIMILARITY = 0.92      # cosine similarity at which a reworded description reuses its enrichment
+MAX_CONCURRENT_REQUESTS = 8   # URLs processed in parallel
+REQUESTS_PER_MINUTE = 60      # Gemini calls allowed across all URLs
+TOKENS_PER_MINUTE = 1_000_000 # Gemini input + output tokens allowed across all URLs
+ENRICH_BATCH_SIZE = 8         # grants summarized per enrichment call
+FEEDBACK_RETRIES = 2          # re-asks per URL when the response fails to parse or validate
+
+# Request configs are the same for every call, so they are built once
+# JSON mode is left off: gemini-2.5-flash returns 400 when response_mime_type/schema is combined
+# with the Search tool, so the grounded text is validated against GrantData after the call instead
+GENERATION_CONFIG = genai.types.GenerateContentConfig(
+    temperature=TEMPERATURE,
+    max_output_tokens=MAX_TOKENS,
+    # This tool enables web access (Grounding)
+    tools=[{"google_search": {}}],
+)
+# Recovery for grounded text that fails parse_and_validate: a tool-less call, so JSON mode is allowed
+REFORMAT_CONFIG = genai.types.GenerateContentConfig(
+    temperature=0,
+    max_output_tokens=MAX_TOKENS,
+    response_mime_type="application/json",
+    response_json_schema=GrantListAdapter.json_schema(),
+)
+ENRICHMENT_CONFIG = genai.types.GenerateContentConfig(
+    temperature=0.4,
+    max_output_tokens=512 * ENRICH_BATCH_SIZE,
+    response_mime_type="application/json",
+    response_schema=List[EnrichItem],
+)
+
+# Shared by all tasks so concurrent extraction still respects the API quota
+gemini_bucket = AsyncTokenBucket(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+
+
+# HTTP status codes worth retrying; other API errors (bad request, auth, not found) fail immediately
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast once fail_max consecutive calls have failed, so a dead endpoint
+    doesn't keep every pending URL retrying. After reset_timeout seconds calls are let through again.
+    """
+
+    def __init__(self, fail_max: int = 20, reset_timeout: float = 60):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+
+    async def call(self, func, *args, **kwargs):
+        if self._failures >= self.fail_max and time.monotonic() - self._opened_at < self.reset_timeout:
+            raise CircuitOpenError(f"{self._failures} consecutive Gemini failures; skipping call")
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            self._failures += 1
+            if self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+            raise
+        self._failures = 0
+        return result
+
+
+gemini_breaker = CircuitBreaker()
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, genai.errors.APIError):
+        return exc.code in RETRYABLE_STATUS_CODES
+    return True  # network errors, empty responses
+
+
+def _is_quota_error(exc: BaseException) -> bool:
+    """Rate-limit / overload responses: the only failures worth backing off for."""
+    return isinstance(exc, genai.errors.APIError) and exc.code in RETRYABLE_STATUS_CODES
+
 
+def _stop_transient_after_one_retry(retry_state) -> bool:
+    # Network errors and empty responses get one immediate retry; backing off doesn't help them
+    return retry_state.attempt_number >= 2 and not _is_quota_error(retry_state.outcome.exception())
 
-def build_prompt(url: str) -> str:
-    # define schema for data generation (JSON)
-    schema_definition = """
+
+def _log_retry(retry_state):
+    logging.warning(
+        f"Gemini request failed: {retry_state.outcome.exception()}. "
+        f"Retrying in {retry_state.next_action.sleep:.1f}s..."
+    )
+
+
+# Schema for data generation (JSON)
+_PROMPT_SCHEMA = """
 [
     {
         "grant_id": "Unique identifier for the grant (e.g., GOV_AB_2025_001).",
@@ -101,19 +222,19 @@ def build_prompt(url: str) -> str:
     }
 ]
     """
-    
-    return f"""
+# Only the URL changes between calls, so it goes last: every request then starts with the
+# same long prefix, which Gemini 2.5 caches implicitly and bills at the cached-token rate
+_PROMPT_PREFIX = f"""
     You are an expert grant data extraction assistant.
 
-    **Action:** Visit the webpage at: {url}
-    **Task:** Extract ALL grant programs listed on the page.
+    **Task:** Visit the webpage given at the end and extract ALL grant programs listed on it.
 
     **Formatting Rules:**
     1.  Return **ONLY THE VALID JSON ARRAY/OBJECT** — do not include any markdown, commentary, or text outside the JSON structure.
     2.  The JSON structure MUST strictly adhere to the following schema definition. Use **EXACTLY** these field names:
 
     SCHEMA REFERENCE (Use exactly these field names, filling required data):
-    {schema_definition}
+    {_PROMPT_SCHEMA}
 
     **Content Rules:**
     -   If the page lists multiple grants, return an array of JSON objects.
@@ -128,52 +249,112 @@ def build_prompt(url: str) -> str:
     ***
     
     -   For list fields (e.g., eligible_provinces), always return a JSON array ([]), even if empty or only containing one item.
+
+    **Webpage:** """
+
+
+_FEEDBACK_TMPL = "\nYour previous output had error: {}. Return corrected JSON only.\n"
+
+
+def build_prompt(url: str, prior_error: Optional[str] = None) -> str:
+    if prior_error:
+        return "".join((_PROMPT_PREFIX, url, _FEEDBACK_TMPL.format(prior_error)))
+    return _PROMPT_PREFIX + url
+
+
+_CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+# Characters that break JSON parsing, cleaned in a single translate() pass
+_CLEAN_TRANS = str.maketrans({
+    '\u00a0': ' ',  # Non-breaking space
+    '\u200b': None, # Zero-width space
+})
+
+
+async def _generate_grants_json(prompt: str) -> str:
+    """One grounded extraction call; returns the JSON text with any code fence and stray spaces removed."""
+    await gemini_bucket.acquire(estimate_tokens(prompt, MAX_TOKENS))
+    response = await gemini_breaker.call(
+        client.aio.models.generate_content,
+        model=MODEL_NAME,
+        contents=prompt,
+        config=GENERATION_CONFIG,
+    )
+    return _CODE_FENCE_RE.sub("", (response.text or "").strip()).translate(_CLEAN_TRANS)
+
+
+_REFORMAT_PROMPT = """
+Convert the grant information below into a JSON array of grant objects matching the response schema.
+Use only the information given; leave a field empty or null when it is not stated.
+
+"""
+
+
+async def reformat_to_schema(raw_text: str, url: str) -> Optional[str]:
     """
+    Rewrite grounded text that failed validation as schema-constrained JSON.
+    Returns the JSON text, or None if the call fails.
+    """
+    prompt = _REFORMAT_PROMPT + raw_text
+    try:
+        await gemini_bucket.acquire(estimate_tokens(prompt, MAX_TOKENS))
+        response = await gemini_breaker.call(
+            client.aio.models.generate_content,
+            model=MODEL_NAME,
+            contents=prompt,
+            config=REFORMAT_CONFIG,
+        )
+        return response.text
+    except Exception as e:
+        logging.warning(f"Reformatting the response for {url} failed ({e})")
+        return None
 
 
-def extract_from_gemini(url: str, retries: int = 3, backoff: float = 2.0) -> Optional[str]:
+async def extract_from_gemini(url: str, retries: int = 3, backoff: float = 2.0,
+                              prior_error: Optional[str] = None) -> Optional[str]:
     """
     Handles the API call with retry/backoff, and CRITICALLY, enables Google Search Grounding.
-    The response_mime_type and response_schema are REMOVED to avoid the 400 error.
+    The JSON text is validated against GrantData by parse_and_validate.
+    prior_error, if given, is fed back so the model can correct its last response.
     Returns raw JSON text or None on failure.
     """
-    prompt = build_prompt(url)
+    prompt = build_prompt(url, prior_error)
+
+    backoff_wait = wait_exponential_jitter(initial=backoff, max=30)
+    retrying = AsyncRetrying(
+        # 4xx other than 429 fail on the first attempt (see _is_retryable)
+        stop=stop_any(stop_after_attempt(retries), _stop_transient_after_one_retry),
+        wait=lambda rs: backoff_wait(rs) if _is_quota_error(rs.outcome.exception()) else 0,
+        retry=retry_if_exception(_is_retryable),
+        before_sleep=_log_retry,
+        reraise=True,
+    )
     
-    for attempt in range(1, retries + 1):
-        try:
-            logging.info(f"Extracting from {url} (attempt {attempt}/{retries})")
-            
-            # The prompt now contains the full schema definition
-            response = client.models.generate_content(
-                model=MODEL_NAME,
-                contents=prompt,
-                config=genai.types.GenerateContentConfig(
-                    temperature=TEMPERATURE,
-                    max_output_tokens=MAX_TOKENS,
-                    # This tool enables web access (Grounding)
-                    tools=[{"google_search": {}}], 
-                ),
-            )
-            
-            # process extracted data
-            raw_text = response.text.strip()
-            if raw_text.startswith("```json"):
-                raw_text = raw_text.strip("```json").strip("```").strip()
-            
-            raw_text = raw_text.replace('\u00a0', ' ')
-            raw_text = raw_text.replace('\u200b', '')
-            
-            return raw_text
-        
-        except Exception as e:
-            wait = backoff * (2 ** (attempt - 1)) + random.uniform(0, 1)
-            logging.warning(f"Gemini request failed: {e}. Retrying in {wait:.1f}s...")
-            time.sleep(wait)
-            
-    logging.error(f"All attempts failed for: {url}")
+    try:
+        async for attempt in retrying:
+            with attempt:
+                logging.info(f"Extracting from {url} (attempt {attempt.retry_state.attempt_number}/{retries})")
+                
+                raw_text = await _generate_grants_json(prompt)
+                if not raw_text:
+                    raise ValueError("Empty response from Gemini")
+
+                return raw_text
+    except Exception as e:
+        logging.error(f"All attempts failed for: {url} ({e})")
     return None
 
 
+def extraction_cache_key(url: str) -> str:
+    """Cache key for a URL's extraction: the model settings and the full prompt."""
+    return llm_cache.make_key(MODEL_NAME, str(TEMPERATURE), build_prompt(url))
+
+
+def _generate_grant_id(funder: Optional[str]) -> str:
+    funder_base = (funder or "UNKNOWN").replace(" ", "_").upper()[:10]
+    return f"{funder_base}_{uuid.uuid4().hex[:12]}"
+
+
 def parse_and_validate(raw_json: str, source_url: str) -> tuple[list, list]:
     """
     Parse Gemini's JSON response and validate each record using GrantSchema.
@@ -185,10 +366,30 @@ def parse_and_validate(raw_json: str, source_url: str) -> tuple[list, list]:
         logging.warning(f"No content returned for {source_url}")
         return valid_records, invalid_records
 
+    # Fast path: parse and validate straight from the JSON text in one pydantic-core pass.
+    # Anything it rejects (bad JSON, missing grant_id, invalid records) takes the slow path below.
     try:
-        parsed = json.loads(raw_json)
+        if raw_json.lstrip().startswith("["):
+            grants = GrantListAdapter.validate_json(raw_json)
+        else:
+            grants = [GrantData.model_validate_json(raw_json)]
+    except ValidationError:
+        pass
+    else:
+        for grant in grants:
+            if not grant.grant_id:
+                grant.grant_id = _generate_grant_id(grant.funder)
+        return [{**grant.model_dump(), "source_url": source_url} for grant in grants], invalid_records
+
+    try:
+        try:
+            parsed = orjson.loads(raw_json)
+        except orjson.JSONDecodeError:
+            # orjson rejects a few inputs the stdlib accepts (NaN, Infinity); let json.loads have the final word
+            parsed = json.loads(raw_json)
     except json.JSONDecodeError as e:
         logging.error(f"JSON parsing error for {source_url}: {e} (Raw: {raw_json[:500]}...)")
+        invalid_records.append({"source_url": source_url, "error": f"JSON parsing error: {e}", "data_preview": raw_json[:200]})
         return valid_records, invalid_records
 
     # Handle both single objects and arrays
@@ -196,27 +397,47 @@ def parse_and_validate(raw_json: str, source_url: str) -> tuple[list, list]:
         parsed = [parsed]
     elif not isinstance(parsed, list):
         logging.warning(f"Unexpected JSON structure for {source_url}")
+        invalid_records.append({"source_url": source_url, "error": "Expected a JSON array of grant objects", "data_preview": raw_json[:200]})
         return valid_records, invalid_records
 
     for item in parsed:
+        if not isinstance(item, dict):
+            continue
         item["source_url"] = source_url
 
         # Auto-generate grant_id if missing or empty
         if not item.get("grant_id"):
-            funder_base = (item.get("funder") or "UNKNOWN").replace(" ", "_").upper()[:10]
-            item["grant_id"] = f"{funder_base}_{int(time.time())}_{random.randint(100,999)}"
+            item["grant_id"] = _generate_grant_id(item.get("funder"))
 
-        try:
-            # Pydantic validation
-            validated = GrantData(**item)
-            valid_records.append(validated.model_dump())
-        except Exception as e:
-            logging.warning(f"Validation failed for {source_url} (ID: {item.get('grant_id', 'N/A')}): {e}")
-            invalid_records.append({"source_url": source_url, "error": str(e), "data_preview": item})
+    # Validate the batch once; the error locations say which items failed
+    try:
+        grants = GrantListAdapter.validate_python(parsed)
+        bad = {}
+    except ValidationError as e:
+        bad = {}
+        for err in e.errors():
+            loc = ".".join(map(str, err["loc"][1:])) or "item"
+            bad.setdefault(err["loc"][0], []).append(f"{loc}: {err['msg']}")
+        grants = GrantListAdapter.validate_python([item for i, item in enumerate(parsed) if i not in bad])
+
+    # GrantData has no source_url field; keep it so saved URLs can be recorded as processed
+    valid_records = [{**grant.model_dump(), "source_url": source_url} for grant in grants]
+
+    for i, messages in bad.items():
+        item = parsed[i]
+        grant_id = item.get("grant_id", "N/A") if isinstance(item, dict) else "N/A"
+        error = f"{len(messages)} validation error(s) for GrantData: " + "; ".join(messages)
+        logging.warning(f"Validation failed for {source_url} (ID: {grant_id}): {error}")
+        invalid_records.append({"source_url": source_url, "error": error, "data_preview": orjson.dumps(item)[:200].decode("utf-8", "ignore")})
 
     return valid_records, invalid_records
 
 
+# Boilerplate that marks a scraped description as generic, matched in one case-insensitive scan
+GENERIC_DESC_MARKERS = ("click here", "learn more")
+_GENERIC_DESC_RE = re.compile("|".join(map(re.escape, GENERIC_DESC_MARKERS)), re.I)
+
+
 def quality_check(grant: dict) -> bool:
     """
     Returns True if grant passes quality checks,
@@ -233,77 +454,196 @@ def quality_check(grant: dict) -> bool:
         return False
 
     # Condition 3 — description too short or generic
-    desc = grant.get("description", "").strip().lower()
-    if len(desc) < 80 or "click here" in desc or "learn more" in desc:
+    desc = grant.get("description", "").strip()
+    if len(desc) < 80 or _GENERIC_DESC_RE.search(desc):
         return False
 
     return True
 
 
-def enrich_grant_text(description: str, notes: str) -> tuple[str, list]:
+def _normalise(text) -> str:
+    """Lower-cased with runs of whitespace collapsed, so trivially reformatted text matches."""
+    return " ".join((text or "").split()).lower()
+
+
+def _enrich_keys(item: dict) -> tuple[str, str]:
     """
-    Uses Gemini to generate a concise summary and list of keywords for faster AI matching.
+    (exact, scope) enrichment cache keys for a grant. Both include the normalised title and
+    funder, so sibling grants sharing a description on one funder page never reuse each
+    other's enrichment; exact also covers the description and notes.
+    """
+    title, funder = _normalise(item.get("title")), _normalise(item.get("funder"))
+    exact = llm_cache.make_key(
+        "enrich-item", MODEL_NAME, title, funder, _normalise(item.get("description")), _normalise(item.get("notes"))
+    )
+    scope = llm_cache.make_key("enrich-scope", MODEL_NAME, title, funder)
+    return exact, scope
+
+
+def _cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a) * sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+async def _similar_descriptions(pairs: list) -> list:
     """
+    For each (new, previous) description pair, whether the two are near-duplicates.
+    Every pair is embedded in one rate-limited call; if it fails nothing counts as similar.
+    """
+    if not pairs:
+        return []
+    texts = [text for pair in pairs for text in pair]
     try:
-        prompt = f"""
-        You will be given a grant description and notes.
-        Create two short outputs:
+        await gemini_bucket.acquire(sum(map(len, texts)) // 4)
+        result = await client.aio.models.embed_content(model=EMBEDDING_MODEL, contents=texts)
+    except Exception as e:
+        logging.warning(f"Embedding failed, enriching {len(pairs)} reworded grant(s) again: {e}")
+        return [False] * len(pairs)
+    vectors = [embedding.values for embedding in result.embeddings]
+    return [_cosine(vectors[2 * i], vectors[2 * i + 1]) >= ENRICH_SIMILARITY for i in range(len(pairs))]
+
+
+_ENRICH_PROMPT_HEAD = """
+        You will be given several grants, each as a numbered block with a description and notes.
+        For every block create two short outputs:
         1. summary: 2–3 sentences summarizing the purpose, eligibility, and impact.
         2. keywords: a list of 5–10 relevant thematic keywords (lowercase).
 
-        Return strictly as JSON with fields:
-        {{
-            "summary": "",
-            "keywords": []
-        }}
+        Return strictly as a JSON array with one entry per block:
+        [
+            {"i": 0, "summary": "", "keywords": []}
+        ]
+"""
 
-        Description:
-        {description}
 
-        Notes:
-        {notes}
-        """
+def build_enrich_prompt(items: list) -> str:
+    blocks = "".join(
+        f"\n        --- Grant {i} ---\n        Description:\n        {item['description']}\n\n        Notes:\n        {item['notes']}\n"
+        for i, item in enumerate(items)
+    )
+    return _ENRICH_PROMPT_HEAD + blocks
 
-        response = client.models.generate_content(
+
+async def _enrich_batch(items: list) -> list:
+    """
+    One Gemini call for up to ENRICH_BATCH_SIZE grants; results come back in item order.
+    Callers only send grants that missed the per-grant cache, so the call itself isn't cached.
+    """
+    results = [("", [])] * len(items)
+    try:
+        prompt = build_enrich_prompt(items)
+        await gemini_bucket.acquire(estimate_tokens(prompt, ENRICHMENT_CONFIG.max_output_tokens))
+        response = await client.aio.models.generate_content(
             model=MODEL_NAME,
             contents=prompt,
-            config=genai.types.GenerateContentConfig(
-                temperature=0.4,
-                max_output_tokens=512,
-                response_mime_type="application/json"
-            ),
+            config=ENRICHMENT_CONFIG,
         )
-
-        enriched = json.loads(response.text)
-        return enriched.get("summary", ""), enriched.get("keywords", [])
+        enriched = EnrichListAdapter.validate_json(response.text)
     except Exception as e:
-        logging.warning(f"Keyword enrichment failed: {e}")
-        return "", []
+        logging.warning(f"Keyword enrichment failed for {len(items)} grant(s): {e}")
+        return results
+
+    for entry in enriched:
+        if 0 <= entry.i < len(items):
+            results[entry.i] = (entry.summary, entry.keywords)
+    return results
+
+
+async def enrich_grants_text(items: list) -> tuple[list, int]:
+    """
+    Uses Gemini to generate a concise summary and list of keywords for faster AI matching.
+    items are dicts with title, funder, description and notes; grants are sent ENRICH_BATCH_SIZE per call.
+    A grant enriched on an earlier run reuses that result when its text is unchanged, or when the
+    same grant (title and funder) comes back with a description at least ENRICH_SIMILARITY alike.
+    Returns (one (summary, keywords) per item, ("", []) where enrichment failed; number reused).
+    """
+    results = [("", [])] * len(items)
+    if not items:
+        return results, 0
+
+    keys = [_enrich_keys(item) for item in items]
+
+    pending, reworded = [], []
+    for idx, (exact, scope) in enumerate(keys):
+        cached = llm_cache.get(exact)
+        if cached is not None:
+            summary, keywords = orjson.loads(cached)
+            results[idx] = (summary, keywords)
+            continue
+        previous = llm_cache.get(scope)
+        if previous is not None and (items[idx].get("description") or "").strip():
+            reworded.append((idx, orjson.loads(previous)))
+        else:
+            pending.append(idx)
+
+    # Only the same grant with a changed description is compared by embedding
+    similar = await _similar_descriptions([(items[idx]["description"], prev["description"]) for idx, prev in reworded])
+    for (idx, prev), is_similar in zip(reworded, similar):
+        if is_similar:
+            results[idx] = (prev["summary"], prev["keywords"])
+            llm_cache.set(keys[idx][0], orjson.dumps([prev["summary"], prev["keywords"]]).decode())
+        else:
+            pending.append(idx)
+    reused = len(items) - len(pending)
+
+    batches = [pending[i:i + ENRICH_BATCH_SIZE] for i in range(0, len(pending), ENRICH_BATCH_SIZE)]
+    batch_results = await asyncio.gather(*(_enrich_batch([items[idx] for idx in batch]) for batch in batches))
+
+    for batch, enriched in zip(batches, batch_results):
+        for idx, (summary, keywords) in zip(batch, enriched):
+            results[idx] = (summary, keywords)
+            if summary:
+                exact, scope = keys[idx]
+                llm_cache.set(exact, orjson.dumps([summary, keywords]).decode())
+                llm_cache.set(scope, orjson.dumps(
+                    {"description": items[idx]["description"], "summary": summary, "keywords": keywords}
+                ).decode())
+    return results, reused
+
+
+LIST_FIELDS = (
+    "eligible_provinces",
+    "eligible_applicant_type",
+    "eligible_industries",
+    "target_beneficiaries",
+    "supported_project_types",
+    "sdg_alignment",
+)
 
 
 def format_list_fields(record: dict) -> dict:
     """
     Converts list-based fields into semi-column separated strings for CSV export.
     """
-    list_fields = [
-        "eligible_provinces", 
-        "eligible_applicant_type", 
-        "eligible_industries", 
-        "target_beneficiaries", 
-        "supported_project_types", 
-        "sdg_alignment"
-    ]
-    
     #process list fields - join field data with semi-colon, and empty "" when there is no data
-    for field in list_fields:
-        if isinstance(record.get(field), list):
-            record[field] = "; ".join(str(item) for item in record[field])
-        elif record.get(field) is None:
-            record[field] = ""
-            
+    # GrantData guarantees these are lists of strings, so they can be joined directly
+    for field in LIST_FIELDS:
+        values = record.get(field)
+        record[field] = "; ".join(values) if values else ""
+
     return record
 
 
+# CSV column order follows the schema
+CSV_COLUMNS = tuple(GrantData.model_fields)
+INVALID_COLUMNS = ("source_url", "error", "data_preview")
+
+
+def write_csv(path: str, rows, fieldnames, append: bool = False):
+    """
+    Write dict rows in fieldnames order; every row must contain every column.
+    The header is written unless appending to an existing file.
+    """
+    write_header = not (append and os.path.exists(path))
+    with open(path, "a" if append else "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(fieldnames)
+        # itemgetter pulls each row's values in C instead of DictWriter's per-row generator
+        writer.writerows(map(operator.itemgetter(*fieldnames), rows))
+
+
 def save_to_csv(valid_records: list, invalid_records: list):
     """
     Appends validated grant data to the validated_grants.csv
@@ -313,41 +653,150 @@ def save_to_csv(valid_records: list, invalid_records: list):
         logging.warning("No valid records to save.")
         return
 
-    # Apply CSV formatting transformation
-    transformed_records = [format_list_fields(record) for record in valid_records]
-    df = pd.DataFrame(transformed_records)
-
-    # Append to existing CSV if it exists, else create new
-    write_header = not os.path.exists(VALIDATED_CSV)
-    df.to_csv(VALIDATED_CSV, mode="a", header=write_header, index=False, encoding="utf-8")
+    # Apply CSV formatting transformation; append to existing CSV if it exists, else create new
+    write_csv(VALIDATED_CSV, map(format_list_fields, valid_records), CSV_COLUMNS, append=True)
     logging.info(f"Saved {len(valid_records)} validated records to {VALIDATED_CSV}")
 
+    # Record the saved URLs so the next run can skip them without re-reading any CSV
+    saved_urls = dict.fromkeys(r["source_url"] for r in valid_records if r.get("source_url"))
+    with open(PROCESSED_URLS_FILE, "a", encoding="utf-8") as f:
+        f.writelines(f"{url}\n" for url in saved_urls)
+
     # Optionally, store invalids to a separate file
     if invalid_records:
         invalid_path = os.path.join(DATA_DIR, "invalid_records.csv")
-        df_invalid = pd.DataFrame(invalid_records)
-        append_invalid = os.path.exists(invalid_path)
-        df_invalid.to_csv(invalid_path, mode="a", header=not append_invalid, index=False)
+        write_csv(invalid_path, invalid_records, INVALID_COLUMNS, append=True)
         logging.warning(f"{len(invalid_records)} invalid records logged in {invalid_path}")
 
 
-def load_processed_urls():
+def append_raw_output(records: list):
+    """
+    Append validated (pre-formatting) grant records to raw_output.jsonl, one JSON object per line
+    """
+    if not records:
+        return
+
+    with open(RAW_OUTPUT_DIR, "ab", buffering=1 << 20) as f:
+        f.writelines([orjson.dumps(record) + b"\n" for record in records])
+    logging.info(f"Appended {len(records)} validated records to {RAW_OUTPUT_DIR}")
+
+
+def load_processed_urls(candidates: Optional[set] = None) -> set:
     """
     Load URLs that have already been successfully processed to avoid duplication.
+    With candidates, only those URLs are kept, so memory is bounded by the
+    source list rather than by the whole processing history.
     """
+    if os.path.exists(PROCESSED_URLS_FILE):
+        with open(PROCESSED_URLS_FILE, encoding="utf-8") as f:
+            urls = (line.rstrip("\n") for line in f)
+            return {url for url in urls if url and (candidates is None or url in candidates)}
+
+    # No sidecar yet (older data directory): fall back to scanning the CSV.
     # Use a static name for the CSV here so we can check past runs
     static_csv_name = os.path.join(DATA_DIR, "validated_grants.csv")
     if not os.path.exists(static_csv_name):
         return set()
 
     try:
-        df = pd.read_csv(static_csv_name, usecols=["source_url"], dtype={'source_url': str})
-        return set(df["source_url"].dropna().tolist())
+        # Stream just the source_url column into a set
+        with open(static_csv_name, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            if "source_url" not in header:
+                # CSV_COLUMNS follows GrantData, which has no source_url; only the sidecar records URLs
+                logging.info(f"{static_csv_name} has no source_url column; nothing to skip")
+                return set()
+            idx = header.index("source_url")
+            urls = (row[idx] for row in reader if len(row) > idx)
+            return {url for url in urls if url and (candidates is None or url in candidates)}
     except Exception as e:
         logging.error(f"Error loading processed URLs: {e}")
         return set()
 
 
+async def process_url(url: str, sem: asyncio.Semaphore) -> tuple[list, list, int]:
+    """
+    Extract, parse/validate and enrich a single URL.
+    Returns (valid_records, invalid_records, grants whose earlier enrichment was reused)
+    """
+    # The semaphore bounds extraction only; enrichment below runs after the slot is
+    # released, so the next URL's extraction overlaps it (the token bucket still caps RPM)
+    async with sem:
+        logging.info(f"\n---- Processing {url} ----")
+
+        # 1. Extract raw JSON from Gemini, unless a clean response for this URL was cached recently
+        cache_key = extraction_cache_key(url)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            logging.info(f"Using cached Gemini response for {url}")
+            raw = cached
+        else:
+            raw = await extract_from_gemini(url)
+        if not raw:
+            return [], [{"source_url": url, "error": "Gemini extraction failed", "data_preview": ""}], 0
+
+        # 2. Parse + validate (inline: output is capped at MAX_TOKENS, so this is cheap)
+        valid, invalid = parse_and_validate(raw, url)
+        kept_raw = raw
+
+        # Grounded replies are free text, so one that fails to parse/validate is first
+        # reformatted under the schema by a tool-less call before any grounded re-ask
+        if invalid:
+            reformatted = await reformat_to_schema(raw, url)
+            if reformatted:
+                fixed_valid, fixed_invalid = parse_and_validate(reformatted, url)
+                if len(fixed_valid) >= len(valid):
+                    valid, invalid = fixed_valid, fixed_invalid
+                    kept_raw = reformatted
+
+        # Re-ask with the parser/validator errors instead of dropping the call's output
+        for attempt in range(FEEDBACK_RETRIES):
+            if not invalid:
+                break
+            await asyncio.sleep(1.0 * (attempt + 1))
+            prior_error = "; ".join(r["error"] for r in invalid)[:1000]
+            logging.info(f"Re-asking for {url} with {len(invalid)} error(s) fed back (retry {attempt + 1}/{FEEDBACK_RETRIES})")
+            raw = await extract_from_gemini(url, prior_error=prior_error)
+            if not raw:
+                break
+            retry_valid, retry_invalid = parse_and_validate(raw, url)
+            # Keep whichever response produced more usable grants
+            if len(retry_valid) >= len(valid):
+                valid, invalid = retry_valid, retry_invalid
+                kept_raw = raw
+
+        # Only a response that parsed and validated in full is replayed on later runs
+        if invalid:
+            if cached is not None:
+                llm_cache.delete(cache_key)
+        elif kept_raw is not cached:
+            llm_cache.set(cache_key, kept_raw)
+
+    # 3. Enrich each valid grant
+    # We use a separate LLM call for enrichment, which CAN use structured output
+    enrichments, reused = await enrich_grants_text(valid)
+    for grant, (summary, keywords) in zip(valid, enrichments):
+        # Construct enriched notes
+        grant["notes"] = f"{grant['notes'].strip()}\n\n---\nSummary: {summary}\nKeywords: {', '.join(keywords)}"
+
+    return valid, invalid, reused
+
+
+async def process_all(urls: list) -> list:
+    """
+    Process every URL concurrently, at most MAX_CONCURRENT_REQUESTS at a time.
+    Results come back in the same order as `urls`; failures are returned as exceptions.
+    Closes the async client when done, so call it once per run.
+    """
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    try:
+        return await asyncio.gather(*(process_url(url, sem) for url in urls), return_exceptions=True)
+    finally:
+        # Release pooled connections while the event loop is still running
+        await client.aio.aclose()
+
+
 def run_pipeline():
     """
     Full end-to-end process:
@@ -363,43 +812,33 @@ def run_pipeline():
         return
 
     all_valid, all_invalid = [], []
-    total = len(SOURCES)
-    processed = load_processed_urls()
-
-    logging.info(f"Starting batch extraction for {total} sources.")
+    enrich_reused = 0
+    # Duplicates in the source list would be extracted (and saved) twice
+    sources = list(dict.fromkeys(SOURCES))
+    processed = load_processed_urls(set(sources))
+    pending = [url for url in sources if url not in processed]
+
+    logging.info(f"Starting batch extraction for {len(sources)} sources.")
+    if len(sources) < len(SOURCES):
+        logging.info(f"Ignoring {len(SOURCES) - len(sources)} duplicate source URLs.")
     logging.info(f"Skipping {len(processed)} URLs already processed.")
 
-    for i, url in enumerate(SOURCES, start=1):
-        if url in processed:
-            logging.info(f"---- Skipping already processed: {url}")
-            continue
-
-        logging.info(f"\n---- [{i}/{total}] Processing {url} ----")
+    # 1-3. Extract, validate and enrich several URLs at a time
+    results = asyncio.run(process_all(pending))
 
-        # 1. Extract raw JSON from Gemini
-        raw = extract_from_gemini(url)
-        if not raw:
-            all_invalid.append({"source_url": url, "error": "Gemini extraction failed"})
+    # 4. Aggregate results
+    for i, (url, result) in enumerate(zip(pending, results), start=1):
+        if isinstance(result, Exception):
+            logging.error(f"[{i}/{len(pending)}] Processing raised for {url}: {result}")
+            all_invalid.append({"source_url": url, "error": str(result), "data_preview": ""})
             continue
-
-        # 2. Parse + validate
-        valid, invalid = parse_and_validate(raw, url)
-
-        # 3. Enrich each valid grant
-        for grant in valid:
-            # We use a separate LLM call for enrichment, which CAN use structured output 
-            summary, keywords = enrich_grant_text(grant["description"], grant["notes"]) 
-
-            # Construct enriched notes
-            enriched_note = f"{grant['notes'].strip()}\n\n---\nSummary: {summary}\nKeywords: {', '.join(keywords)}"
-            grant["notes"] = enriched_note
-
-
-        # 4. Aggregate results
+        valid, invalid, reused = result
+        enrich_reused += reused
         all_valid.extend(valid)
         all_invalid.extend(invalid)
 
-        time.sleep(2)  # slight delay to avoid rate limit
+    # Keep the list fields as JSON arrays before format_list_fields joins them for CSV
+    append_raw_output(all_valid)
 
     # 5. Split between high-quality and manual-review grants
     high_quality, manual_review = [], []
@@ -416,16 +855,17 @@ def run_pipeline():
     if manual_review:
         review_path = os.path.join(DATA_DIR, "manual_review.csv")
         # Apply formatting for the review file too
-        df_review = pd.DataFrame([format_list_fields(r) for r in manual_review])
-        append_review = os.path.exists(review_path)
-        df_review.to_csv(review_path, mode="a", header=not append_review, index=False, encoding="utf-8")
+        write_csv(review_path, map(format_list_fields, manual_review), CSV_COLUMNS, append=True)
         logging.warning(f"{len(manual_review)} records moved to manual review at {review_path}")
 
 
     logging.info("=== Extraction Complete ===")
-    logging.info(f"Total URLs processed: {total}")
+    logging.info(f"Total URLs processed: {len(pending)}")
     logging.info(f"Valid grants: {len(all_valid)}")
     logging.info(f"Invalid grants: {len(all_invalid)}")
+    cache_stats = llm_cache.stats()
+    logging.info(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    logging.info(f"Enrichment reused for {enrich_reused} previously enriched grants")
     logging.info(f"Output file: {VALIDATED_CSV}")
 
 
@@ -0,0 +1,93 @@
+"""
+On-disk cache for Gemini responses.
+
+Responses are stored in a single SQLite file (WAL mode) keyed by a SHA-256
+hash of everything that influences the model output, so re-running the
+pipeline on unchanged sources skips the API call entirely.
+
+Each pipeline folder runs (and is deployed) on its own, so it carries its own
+copy of this module. extract-to-csv-model2/llm_cache.py is the source: edit it,
+then run `python sync_shared.py` from the repository root to update the others.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+CACHE_PATH = "data/cache/llm_cache.sqlite"
+DEFAULT_TTL = 7 * 86400  # one week
+
+_conn = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        _conn.commit()
+    return _conn
+
+
+def make_key(*parts: str) -> str:
+    """Build a cache key from the model settings, prompt and page content."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached response for key, or None if missing or expired."""
+    try:
+        with _lock:
+            row = _connect().execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+    except sqlite3.Error as e:
+        logging.warning(f"LLM cache read failed: {e}")
+        row = None
+
+    if row is None or row[1] < time.time():
+        _stats["misses"] += 1
+        return None
+
+    _stats["hits"] += 1
+    return row[0]
+
+
+def set(key: str, value: str, ttl: int = DEFAULT_TTL) -> None:
+    """Store a response for ttl seconds."""
+    try:
+        with _lock:
+            conn = _connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        logging.warning(f"LLM cache write failed: {e}")
+
+
+def delete(key: str) -> None:
+    """Drop a cached response, e.g. one that turned out not to validate."""
+    try:
+        with _lock:
+            conn = _connect()
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+    except sqlite3.Error as e:
+        logging.warning(f"LLM cache delete failed: {e}")
+
+
+def stats() -> dict:
+    """Hit/miss counters for this run."""
+    return dict(_stats)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import List, Optional
 
 
@@ -26,4 +26,16 @@ class GrantData(BaseModel):
     is_recurring: bool = Field(description="True if the grant is offered on a regular cycle (e.g., annually), False otherwise.")
     notes: str = Field(description="Any essential caveats or additional information.")
     application_questions_link: Optional[str] = Field(None, description="Direct URL to the FAQ, question guide, or contact page for application inquiries.")
-    application_package_link: Optional[str] = Field(None, description="Direct URL to downloadable application forms, package, or guide documents.")
\ No newline at end of file
+    application_package_link: Optional[str] = Field(None, description="Direct URL to downloadable application forms, package, or guide documents.")
+
+# Built once: validating a whole response reuses this compiled schema
+GrantListAdapter = TypeAdapter(List[GrantData])
+
+
+class EnrichItem(BaseModel):
+    i: int = Field(description="Index of the grant block this entry belongs to.")
+    summary: str = Field(description="2-3 sentences summarizing the purpose, eligibility, and impact.")
+    keywords: List[str] = Field(description="5-10 relevant thematic keywords (lowercase).")
+
+
+EnrichListAdapter = TypeAdapter(List[EnrichItem])
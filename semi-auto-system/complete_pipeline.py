@@ -1,6 +1,6 @@
 import os
-import subprocess
 import logging
+import importlib
 from datetime import datetime
 
 # --- Setup logging ---
@@ -17,14 +17,27 @@ def setup_log():
     return log_file
 
 
-def run_stage(stage_name, command):
+def run_stage(stage_name, module_name):
+    """
+    Run a stage's main() in this interpreter. The module is imported only when
+    its stage starts, so its import-time setup still happens in stage order.
+    Log records go to the pipeline log and, while the stage runs, to the stage's own log file.
+    """
+    root = logging.getLogger()
+    pipeline_handlers = list(root.handlers)
     logging.info(f"Starting stage: {stage_name}")
     try:
-        subprocess.run(command, check=True)
+        importlib.import_module(module_name).main()
         logging.info(f"{stage_name} completed successfully.\n")
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         logging.error(f"{stage_name} failed with error: {e}")
         raise
+    finally:
+        # Detach the stage's own log file so the next stage doesn't write into it
+        for handler in root.handlers[:]:
+            if handler not in pipeline_handlers:
+                root.removeHandler(handler)
+                handler.close()
 
 
 def main():
@@ -32,14 +45,14 @@ def main():
     logging.info("=== Starting Semi-Automated Grant Data Pipeline ===")
 
     stages = [
-        ("Extraction", ["python", "extract_grants.py"]),
-        ("Transformation + Validation", ["python", "transform_and_validate.py"]),
-        ("Metrics Computation", ["python", "compute_metrics.py"]),
-        ("Google Drive Upload", ["python", "utils/drive_uploader.py"]),
+        ("Extraction", "extract_grants"),
+        ("Transformation + Validation", "transform_and_validate"),
+        ("Metrics Computation", "compute_metrics"),
+        ("Google Drive Upload", "utils.drive_uploader"),
     ]
 
-    for stage_name, command in stages:
-        run_stage(stage_name, command)
+    for stage_name, module_name in stages:
+        run_stage(stage_name, module_name)
 
     logging.info("All pipeline stages completed successfully.")
     logging.info(f"Logs saved to {log_file}")
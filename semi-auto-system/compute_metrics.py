@@ -1,51 +1,118 @@
 import os
-import glob
+import ast
 import pandas as pd
 import logging
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timezone
 import gspread
 from google.oauth2.service_account import Credentials
 
 
 # set up logging
-def setup_log():
+def setup_log(timestamp):
     os.makedirs("data/logs", exist_ok=True)
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     log_file = f"data/logs/metrics_{timestamp}.log"
 
-    logging.basicConfig(
-        filename=log_file,
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-    )
-    logging.getLogger().addHandler(logging.StreamHandler())
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            filename=log_file,
+            level=logging.INFO,
+            format="%(asctime)s [%(levelname)s] %(message)s",
+        )
+        logging.getLogger().addHandler(logging.StreamHandler())
+    else:
+        # Under complete_pipeline: also write this stage's file (removed again when the stage ends)
+        handler = logging.FileHandler(log_file)
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        logging.getLogger().addHandler(handler)
     return log_file
 
 
 
 def get_latest_clean_file():
-    files = glob.glob("data/clean/grants_clean_*.csv")
+    # Names embed a %Y%m%d_%H%M%S timestamp, so the newest file sorts last by name; no stat() needed
+    try:
+        with os.scandir("data/clean") as entries:
+            files = [e.path for e in entries if e.name.startswith("grants_clean_") and e.name.endswith(".csv")]
+    except FileNotFoundError:
+        files = []
     if not files:
         logging.error("No processed CSV files found in data/clean/")
         raise FileNotFoundError("No processed CSV files found.")
-    latest = max(files, key=os.path.getctime)
+    latest = max(files)
     logging.info(f"Using latest processed file: {latest}")
     return latest
 
 
+def _list_literal_len(value):
+    """Length of a "['a', 'b']" cell; falls back to counting commas if it isn't a valid literal."""
+    try:
+        return len(ast.literal_eval(value))
+    except (ValueError, SyntaxError):
+        return value.count(",") + 1 if value.strip("[] ") else 0
+
+
+def avg_list_lengths(df, fields):
+    """
+    Average item count of each list column, where cells are either "[...]" list
+    literals or "; "-separated strings. All columns are stacked and measured in one
+    pass; columns missing from df, or with no values, average 0.
+    """
+    averages = dict.fromkeys(fields, 0)
+    present = [f for f in fields if f in df.columns]
+    if not present:
+        return averages
+
+    stacked = df[present].melt(var_name="field", value_name="value").dropna(subset=["value"])
+    values = stacked["value"].astype(str)
+    lengths = values.str.count(";") + 1
+    is_list = values.str.startswith("[")
+    if is_list.any():
+        # Parse each distinct literal once; list columns repeat the same few values a lot
+        list_cells = values[is_list]
+        literal_lens = {v: _list_literal_len(v) for v in pd.unique(list_cells)}
+        lengths[is_list] = list_cells.map(literal_lens)
+
+    averages.update(lengths.groupby(stacked["field"]).mean().to_dict())
+    return averages
+
+
+# Required fields
+REQUIRED_FIELDS = [
+    "grant_id", "title", "description", "funder",
+    "funder_type", "funding_type", "currency",
+    "deadline", "application_url"
+]
+LIST_FIELDS = [
+    "eligible_provinces", "eligible_applicant_type", "eligible_industries",
+    "target_beneficiaries", "supported_project_types", "sdg_alignment"
+]
+# The only columns compute_metrics reads; everything else in the clean CSV is skipped at parse time
+METRIC_COLUMNS = frozenset(REQUIRED_FIELDS + LIST_FIELDS)
+# Low-cardinality columns that only feed value_counts; as categories they are counted by integer code
+CATEGORY_FIELDS = ("currency", "funding_type")
+
+
+def read_metric_columns(path):
+    dtypes = {c: "string" for c in METRIC_COLUMNS}
+    dtypes.update(dict.fromkeys(CATEGORY_FIELDS, "category"))
+    return pd.read_csv(
+        path,
+        usecols=lambda c: c in METRIC_COLUMNS,
+        dtype=dtypes,
+    )
+
+
 # metrics computing - compute dataset-level completeness and quality metrics
-def compute_metrics(df):
-    # Required fields
-    required_fields = [
-        "grant_id", "title", "description", "funder",
-        "funder_type", "funding_type", "currency",
-        "deadline", "application_url"
-    ]
+def compute_metrics(df, run_ts):
+    required_fields = REQUIRED_FIELDS
 
     total_records = len(df)
     total_fields = len(required_fields) * total_records
-    missing_fields = sum(df[col].isna().sum() + (df[col] == "").sum() for col in required_fields)
+    # One object array over all required columns, NA written as "" so a single comparison
+    # finds every missing cell; a column absent from the file counts as missing
+    required = df.reindex(columns=required_fields, fill_value="").to_numpy(dtype=object, na_value="")
+    missing_fields = int((required == "").sum())
     completeness = round(((total_fields - missing_fields) / total_fields) * 100, 2) if total_fields else 0.0
 
     # Distribution summaries
@@ -53,58 +120,58 @@ def compute_metrics(df):
     funding_type_counts = df["funding_type"].value_counts().to_dict() if "funding_type" in df.columns else {}
 
     # List length averages
-    list_fields = [
-        "eligible_provinces", "eligible_applicant_type", "eligible_industries",
-        "target_beneficiaries", "supported_project_types", "sdg_alignment"
-    ]
-    avg_list_lengths = {}
-    for field in list_fields:
-        if field in df.columns:
-            avg_list_lengths[field] = (
-                df[field].dropna()
-                .apply(lambda x: len(eval(x)) if isinstance(x, str) and x.startswith("[") else len(str(x).split(";")))
-                .mean()
-            )
-        else:
-            avg_list_lengths[field] = 0
+    list_lengths = avg_list_lengths(df, LIST_FIELDS)
 
     metrics = {
-        "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+        "timestamp": run_ts.strftime("%Y-%m-%d %H:%M:%S"),
         "total_records": total_records,
         "missing_required_fields": int(missing_fields),
         "completeness_score": completeness,
         "currency_distribution": str(currency_counts),
         "funding_type_distribution": str(funding_type_counts),
     }
-    metrics.update({f"avg_len_{k}": round(v or 0, 2) for k, v in avg_list_lengths.items()})
+    metrics.update({f"avg_len_{k}": round(v or 0, 2) for k, v in list_lengths.items()})
 
     logging.info(f"Computed metrics: completeness {completeness}% on {total_records} records")
     return metrics
 
 
-def upload_to_google_sheets(metrics):
+SERVICE_ACCOUNT_FILE = "config/google_service_account.json"
+SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
-    load_dotenv()
-    sheet_id = os.getenv("GOOGLE_SHEETS_ID")
-    SERVICE_ACCOUNT_FILE = "config/google_service_account.json"
+_sheets_client = None
 
-    scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-    creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=scopes)
-    client = gspread.authorize(creds)
 
-    sheet = client.open_by_key(sheet_id).sheet1
+def get_sheets_client():
+    """Authorized gspread client, created once per process so the token is reused."""
+    global _sheets_client
+    if _sheets_client is None:
+        creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SHEETS_SCOPES)
+        _sheets_client = gspread.authorize(creds)
+    return _sheets_client
 
-    row = [
-        metrics["timestamp"],
-        metrics["total_records"],
-        metrics["missing_required_fields"],
-        metrics["completeness_score"],
-        metrics["currency_distribution"],
-        metrics["funding_type_distribution"],
+
+def upload_to_google_sheets(metrics_list):
+    """Append one row per metrics dict to the sheet in a single values:append request."""
+    load_dotenv()
+    sheet_id = os.getenv("GOOGLE_SHEETS_ID")
+
+    sheet = get_sheets_client().open_by_key(sheet_id).sheet1
+
+    rows = [
+        [
+            metrics["timestamp"],
+            metrics["total_records"],
+            metrics["missing_required_fields"],
+            metrics["completeness_score"],
+            metrics["currency_distribution"],
+            metrics["funding_type_distribution"],
+        ]
+        for metrics in metrics_list
     ]
 
-    sheet.append_row(row)
-    logging.info(f"Metrics uploaded to Google Sheet successfully.")
+    sheet.append_rows(rows, value_input_option="RAW")
+    logging.info(f"{len(rows)} metrics row(s) uploaded to Google Sheet successfully.")
 
 # main block
 
@@ -112,23 +179,26 @@ def main():
     load_dotenv()
     os.makedirs("data/metrics", exist_ok=True)
 
-    log_file = setup_log()
+    # One UTC timestamp for the whole run: log name, metrics row and output file
+    run_ts = datetime.now(timezone.utc)
+    timestamp = run_ts.strftime("%Y%m%d_%H%M%S")
+
+    log_file = setup_log(timestamp)
     logging.info("...Starting Metrics Computation Phase...")
 
     input_file = get_latest_clean_file()
-    df = pd.read_csv(input_file)
+    df = read_metric_columns(input_file)
 
-    metrics = compute_metrics(df)
+    metrics = compute_metrics(df, run_ts)
 
     # Save locally
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     metrics_path = f"data/metrics/validation_metrics_{timestamp}.csv"
     pd.DataFrame([metrics]).to_csv(metrics_path, index=False)
     logging.info(f"Computed metrics saved locally: {metrics_path}")
 
     # Upload to Google Sheets
     try:
-        upload_to_google_sheets(metrics)
+        upload_to_google_sheets([metrics])
     except Exception as e:
         logging.error(f"Failed to upload to Google Sheets: {e}")
 
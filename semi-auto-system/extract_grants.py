@@ -4,46 +4,24 @@
     with extraction logs in 'data/logs'
 """
 
-import json 
+import csv
+import hashlib
+import orjson
 import os
 import random
-import time
+import sys
+import asyncio
 import logging
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 from google import genai
-from pydantic import BaseModel, Field
-from typing import List, Optional
+import httpx
+from pydantic import ValidationError
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential_jitter
 from utils.email_notifier import send_notification
-
-# --- 1. Define Grant Schema for data collection using Pydantic"
-
-class GrantData(BaseModel):
-    """Structured data extracted from a grant page."""
-    grant_id: str = Field(description="Unique identifier for the grant, e.g., 'VentureLAB_AAI_2024'.")
-    title: str = Field(description="Full, descriptive title of the grant.")
-    description: str = Field(description="A concise summary of the grant's purpose, scope, and who it helps.")
-    funder: str = Field(description="The full name of the organization providing the funding.")
-    funder_type: str = Field(description="Type of funder (e.g., 'Government', 'Non-profit', 'Private Foundation').")
-    funding_type: str = Field(description="Nature of the funding (e.g., 'Grant', 'Loan', 'Tax Credit').")
-    amount_min: Optional[int] = Field(None, description="Minimum funding amount (in CENTS or smallest currency unit). Use None if not specified.")
-    amount_max: Optional[int] = Field(None, description="Maximum funding amount (in CENTS or smallest currency unit). Use None if not specified.")
-    currency: str = Field(description="The three-letter currency code (e.g., 'CAD', 'USD').")
-    deadline: str = Field(description="The application deadline, formatted as 'YYYY-MM-DD' or a descriptive phrase if a date isn't available (e.g., 'Ongoing').")
-    application_complexity: str = Field(description="Estimated complexity (e.g., 'Low', 'Medium', 'High').")
-    eligible_provinces: List[str] = Field(description="List of eligible provinces/states/regions. Use ['National'] if nationwide.")
-    geography_details: str = Field(description="Any specific local or regional restrictions not covered by provinces.")
-    eligible_applicant_type: List[str] = Field(description="List of organization types that can apply (e.g., 'Small Business', 'Non-profit', 'Individual').")
-    eligible_industries: List[str] = Field(description="List of specific industries or sectors targeted.")
-    target_beneficiaries: List[str] = Field(description="List of groups the grant is intended to support (e.g., 'Youth', 'Women-owned businesses').")
-    supported_project_types: List[str] = Field(description="List of projects the grant can fund (e.g., 'R&D', 'Equipment Purchase', 'Training').")
-    sdg_alignment: List[str] = Field(description="List of UN Sustainable Development Goals the grant aligns with.")
-    application_url: str = Field(description="Direct URL to the application page or program details.")
-    is_recurring: bool = Field(description="True if the grant is offered on a regular cycle (e.g., annually), False otherwise.")
-    notes: str = Field(description="Any essential caveats or additional information.")
-    application_docs_raw: str = Field(description="Raw text snippet listing required application documents.")
-    application_questions_text: str = Field(description="Raw text snippet of the main questions or sections in the application.")
+from utils import llm_cache
+from utils.rate_limit import AsyncTokenBucket, estimate_tokens
+from schema import GrantData  # shared with transform_and_validate
 
 # --- 2. SETUP AND CONFIGURATION ---
 
@@ -55,84 +33,184 @@ api_key = os.getenv("GEMINI_API_KEY")
 if not api_key:
     raise ValueError("No GEMINI AI API key found in the .env file")
 
-# configure gemini
-client = genai.Client(api_key=api_key)
-
-
-# Directories
-os.makedirs("data/raw", exist_ok=True)
-os.makedirs("data/logs", exist_ok=True)
-
-timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-log_file = f"data/logs/extraction_{timestamp}.log"
+# configure gemini - a single client whose pooled transport keeps connections alive between URLs
+client = genai.Client(
+    api_key=api_key,
+    http_options=genai.types.HttpOptions(
+        async_client_args={
+            "transport": httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=8)
+            )
+        },
+    ),
+)
 
 
 ## Configure logging
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-)
-logging.getLogger().addHandler(logging.StreamHandler())
+def setup_log(timestamp):
+    os.makedirs("data/logs", exist_ok=True)
+    log_file = f"data/logs/extraction_{timestamp}.log"
+
+    # When run from complete_pipeline the root logger is already set up; don't add a second console handler
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            filename=log_file,
+            level=logging.INFO,
+            format="%(asctime)s [%(levelname)s] %(message)s",
+        )
+        logging.getLogger().addHandler(logging.StreamHandler())
+    else:
+        # Under complete_pipeline: also write this stage's file (removed again when the stage ends)
+        handler = logging.FileHandler(log_file)
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        logging.getLogger().addHandler(handler)
+    return log_file
 
 # --- 3. BEGIN EXTRACTION ---
 
-logging.info("...STARTING EXTRACTION PIPELINE...")
-
 # load config file containing URLs
 SOURCES_FILE = r"config/sources_list.json"
-try:
-    with open(SOURCES_FILE, 'r') as f:
-        sources = json.load(f).get('sources', [])
-        logging.info(f"Loaded {len(sources)} sources from {SOURCES_FILE}")
-except FileNotFoundError:
-    logging.error(f"Error: Could not find sources file at {SOURCES_FILE}")
-    sources = []
 
-# --- Main Extraction Point---
-def extract_grant(url, retries = 3, backoff = 2.0):
-    attempt = 0
-    while attempt < retries:
-        attempt += 1
 
-        try:
-            logging.info(f"Extracting from: {url}. \nAttempting {attempt}/{retries}")
+def load_sources():
+    try:
+        with open(SOURCES_FILE, 'rb') as f:
+            sources = orjson.loads(f.read()).get('sources', [])
+            logging.info(f"Loaded {len(sources)} sources from {SOURCES_FILE}")
+            return sources
+    except FileNotFoundError:
+        logging.error(f"Error: Could not find sources file at {SOURCES_FILE}")
+        return []
+
+# Structured output config, identical for every request
+GENERATION_CONFIG = genai.types.GenerateContentConfig(
+    response_mime_type="application/json",
+    response_schema=GrantData,
+)
 
-            # prompt for data collection
-            prompt = f"""
+# Prompt template, rendered once per URL. The URL is the last thing in it so every call
+# shares the same instruction prefix (Gemini caches repeated prefixes implicitly)
+PROMPT_TEMPLATE = """
                     You are a data extraction assistant for a grant management platform.
-                    Extract all required grant-related information from the following page:
-                    {url}
-                    
+                    Extract all required grant-related information from the page given at the end.
+
                     Ensure amounts are converted to the smallest currency unit (e.g., CENTS if currency is USD/CAD).
                     Populate all fields with the best available data. If data is unavailable, use default/empty values like None for Optionals, or empty lists for List fields.
+
+                    Page: {url}
                     """
 
-            
-            # make the request to gemini with the Structured Output configuration
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=prompt,
-                config=genai.types.GenerateContentConfig(
-                    response_mime_type="application/json", 
-                    response_schema=GrantData,          
-                    ),
-                )
-
-            # parse response
-            parsed_grant = response.parsed
-            grant_dict = parsed_grant.model_dump()
-            grant_dict["source_url"] = url 
-            logging.info(f"SUCCESS: {parsed_grant.title[:70]}")
-            return grant_dict
+MODEL_NAME = "gemini-2.5-flash"
+# Part of every cache key, derived from the GrantData JSON schema so a schema change refetches
+CACHE_VERSION = hashlib.sha256(orjson.dumps(GrantData.model_json_schema(), option=orjson.OPT_SORT_KEYS)).hexdigest()[:16]
+
+MAX_CONCURRENT_REQUESTS = 8   # URLs extracted in parallel
+REQUESTS_PER_MINUTE = 60      # Gemini calls allowed across all URLs
+TOKENS_PER_MINUTE = 1_000_000 # Gemini input + output tokens allowed across all URLs
+EST_OUTPUT_TOKENS = 2048      # budgeted per call for the GrantData response
+
+# Shared by all tasks so concurrent extraction still respects the API quota; the same
+# token bucket the V1.5 pipeline uses, so calls burst freely until the quota is reached
+gemini_bucket = AsyncTokenBucket(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+
+
+def server_retry_delay(exc):
+    """
+    Seconds Gemini asked us to wait before retrying a 429, taken from the
+    Retry-After header or the RetryInfo detail in the error body. None if not given.
+    """
+    if not isinstance(exc, genai.errors.APIError) or exc.code != 429:
+        return None
+
+    headers = getattr(exc.response, "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
 
-        except Exception as e:
-            wait_time = backoff * (2 ** (attempt - 1)) + random.uniform(0, 1)
-            logging.warning(f"ERROR: {e}. Retrying in {wait_time:1f}s...")
-            time.sleep(wait_time)
+    error = exc.details.get("error", {}) if isinstance(exc.details, dict) else {}
+    for detail in error.get("details", []):
+        delay = detail.get("retryDelay")  # e.g. "37s"
+        if detail.get("@type", "").endswith("RetryInfo") and delay:
+            try:
+                return float(delay.rstrip("s"))
+            except ValueError:
+                pass
+    return None
 
-    # if all attempts fail
-    logging.error(f"Extraction failed after {retries} attempts: {url}")
+
+def _log_retry(retry_state):
+    logging.warning(
+        f"ERROR: {retry_state.outcome.exception()}. "
+        f"Retrying in {retry_state.next_action.sleep:.1f}s..."
+    )
+
+
+# --- Main Extraction Point---
+async def extract_grant(url, sem, retries = 3, backoff = 2.0, force = False):
+    # prompt for data collection (built once, reused across retries)
+    prompt = PROMPT_TEMPLATE.format(url=url)
+
+    # A URL extracted recently with the same prompt and schema is served from disk
+    cache_key = llm_cache.make_key(MODEL_NAME, CACHE_VERSION, prompt)
+    cached = None if force else llm_cache.get(cache_key)
+    if cached is not None:
+        try:
+            grant_dict = GrantData.model_validate_json(cached).model_dump()
+        except ValidationError as e:
+            # An entry that no longer fits the schema is treated as a miss
+            logging.warning(f"Ignoring stale cached extraction for {url} ({e.error_count()} validation errors)")
+        else:
+            grant_dict["source_url"] = url
+            logging.info(f"CACHED: {grant_dict['title'][:70]}")
+            return grant_dict
+
+    backoff_wait = wait_exponential_jitter(initial=backoff, jitter=1)
+
+    def wait(retry_state):
+        # Honor the server's delay on a 429 (plus a little jitter); back off exponentially otherwise
+        delay = server_retry_delay(retry_state.outcome.exception())
+        if delay is not None:
+            return delay + random.uniform(0, 1)
+        return backoff_wait(retry_state)
+
+    retrying = AsyncRetrying(
+        stop=stop_after_attempt(retries),
+        wait=wait,
+        before_sleep=_log_retry,
+        reraise=True,
+    )
+
+    try:
+        async for attempt in retrying:
+            with attempt:
+                logging.info(f"Extracting from: {url}. \nAttempting {attempt.retry_state.attempt_number}/{retries}")
+
+                # make the request to gemini with the Structured Output configuration
+                await gemini_bucket.acquire(estimate_tokens(prompt, EST_OUTPUT_TOKENS))
+                async with sem:
+                    response = await client.aio.models.generate_content(
+                        model=MODEL_NAME,
+                        contents=prompt,
+                        config=GENERATION_CONFIG,
+                        )
+
+                # parse response; the SDK already validated it against GrantData with pydantic-core
+                parsed_grant = response.parsed
+                if parsed_grant is None:
+                    # The SDK swallows the ValidationError; validate again so the retry logs the real cause
+                    parsed_grant = GrantData.model_validate_json(response.text or "")
+                llm_cache.set(cache_key, parsed_grant.model_dump_json())
+                grant_dict = parsed_grant.model_dump()
+                grant_dict["source_url"] = url 
+                logging.info(f"SUCCESS: {parsed_grant.title[:70]}")
+                return grant_dict
+
+    except Exception as e:
+        # if all attempts fail
+        logging.error(f"Extraction failed after {retries} attempts: {url} ({e})")
 
     return {"source_url": url, "error": "Extraction failed after retries"}
 
@@ -140,29 +218,66 @@ def extract_grant(url, retries = 3, backoff = 2.0):
 
 # Execution loop
 
-def run_batch_extraction():
-    results, failures = [], []
+# Fixed column order for the raw CSV: schema fields, then the source URL and any extraction error
+RAW_COLUMNS = (*GrantData.model_fields, "source_url", "error")
+
+
+async def extract_all(urls, on_result, force=False):
+    """
+    Extract every URL concurrently, at most MAX_CONCURRENT_REQUESTS in flight.
+    on_result is called with each result as soon as it finishes, in completion order.
+    force skips the extraction cache. Closes the async client when done.
+    """
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    try:
+        for done in asyncio.as_completed([extract_grant(url, sem, force=force) for url in urls]):
+            on_result(await done)
+    finally:
+        await client.aio.aclose()
+
+
+def write_csv(path, rows, fieldnames):
+    """Write dict rows in fieldnames order in one pass; missing columns are left empty."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval="")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_batch_extraction(timestamp, force=False):
+    os.makedirs("data/raw", exist_ok=True)
+    sources = load_sources()
+    failures = []
     total = len(sources)
+    success_count = 0
 
-    for i, url in enumerate(sources, start=1):
-        logging.info(f"\n---- [{i}/{total}] Processing {url} ----")
-        result = extract_grant(url)
-        if "error" in result:
-            failures.append(result)
-        results.append(result)
-        time.sleep(2)
+    logging.info(f"Extracting {total} sources, {MAX_CONCURRENT_REQUESTS} at a time")
 
-    # Save all results
-    df = pd.DataFrame(results)
+    # Each result is written as it arrives, so memory doesn't grow with the number of sources
     out_file = f"data/raw/grants_raw_{timestamp}.csv"
-    df.to_csv(out_file, index=False, encoding="utf-8")
+    with open(out_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RAW_COLUMNS, restval="")
+        writer.writeheader()
+
+        def save_result(result):
+            nonlocal success_count
+            # List fields go out as JSON arrays, which transform_and_validate decodes with orjson
+            writer.writerow({k: orjson.dumps(v).decode() if isinstance(v, list) else v for k, v in result.items()})
+            f.flush()
+            if "error" in result:
+                logging.warning(f"[{success_count + len(failures) + 1}/{total}] Failed: {result['source_url']}")
+                failures.append(result)
+            else:
+                success_count += 1
+
+        asyncio.run(extract_all(sources, save_result, force))
+
     logging.info(f"Saved all records to {out_file}")
 
     # Save failed URLs separately
     if failures:
-        failed_df = pd.DataFrame(failures)
         failed_path = f"data/raw/failed_{timestamp}.csv"
-        failed_df.to_csv(failed_path, index=False)
+        write_csv(failed_path, failures, ("source_url", "error"))
         logging.warning(f"{len(failures)} failures saved to {failed_path}")
     else:
         logging.info("All sources processed successfully.")
@@ -170,17 +285,28 @@ def run_batch_extraction():
     
     logging.info("Extraction job complete.")
     logging.info(f"Total sources: {total}")
-    logging.info(f"Successful: {total - len(failures)}")
+    logging.info(f"Successful: {success_count}")
     logging.info(f"Failed: {len(failures)}")
+    cache_stats = llm_cache.stats()
+    logging.info(f"Extraction cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
     
     # Return metrics and output path for downstream notification
-    return (total - len(failures), len(failures), out_file)
+    return (success_count, len(failures), out_file)
 
-if __name__ == "__main__":
-    success_count, fail_count, out_file = run_batch_extraction()
+def main(force=False):
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    log_file = setup_log(timestamp)
+    logging.info("...STARTING EXTRACTION PIPELINE...")
+
+    success_count, fail_count, out_file = run_batch_extraction(timestamp, force)
     send_notification(
         success_count=success_count,
         fail_count=fail_count,
         csv_path=out_file,
         log_path=log_file,
-        )
\ No newline at end of file
+        )
+
+
+if __name__ == "__main__":
+    # --force re-extracts every URL instead of using cached results
+    main(force="--force" in sys.argv[1:])
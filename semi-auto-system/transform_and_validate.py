@@ -1,14 +1,19 @@
 import os
-import glob
+import sys
+import csv
 import pandas as pd
 import logging
 from dotenv import load_dotenv
 from datetime import datetime
-from pydantic import BaseModel, Field, ValidationError
-from typing import List, Optional
+from pydantic import ValidationError
+from schema import GrantData, GrantListAdapter  # shared with extract_grants
 from utils.email_notifier import send_notification
 import ast 
-import math
+import re
+import orjson
+from collections import deque
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
 
 
 # setup logging
@@ -18,203 +23,262 @@ def setup_log():
 
     log_file = f"data/logs/validation_logs_{timestamp}.log"
 
-    logging.basicConfig(
-        filename=log_file,
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-    )
-    logging.getLogger().addHandler(logging.StreamHandler())
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            filename=log_file,
+            level=logging.INFO,
+            format="%(asctime)s [%(levelname)s] %(message)s",
+        )
+        logging.getLogger().addHandler(logging.StreamHandler())
+    else:
+        # Under complete_pipeline: also write this stage's file (removed again when the stage ends)
+        handler = logging.FileHandler(log_file)
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        logging.getLogger().addHandler(handler)
     return log_file
 
 
-# --1. DEFINE SCHEMA
-class GrantData(BaseModel):
-    """Structured data extracted from a grant page."""
-    grant_id: str = Field(description="Unique identifier for the grant, e.g., 'VentureLAB_AAI_2024'.")
-    title: str = Field(description="Full, descriptive title of the grant.")
-    description: str = Field(description="A concise summary of the grant's purpose, scope, and who it helps.")
-    funder: str = Field(description="The full name of the organization providing the funding.")
-    funder_type: str = Field(description="Type of funder (e.g., 'Government', 'Non-profit', 'Private Foundation').")
-    funding_type: str = Field(description="Nature of the funding (e.g., 'Grant', 'Loan', 'Tax Credit').")
-    amount_min: Optional[int] = Field(None, description="Minimum funding amount (in CENTS or smallest currency unit). Use None if not specified.")
-    amount_max: Optional[int] = Field(None, description="Maximum funding amount (in CENTS or smallest currency unit). Use None if not specified.")
-    currency: str = Field(description="The three-letter currency code (e.g., 'CAD', 'USD').")
-    deadline: str = Field(description="The application deadline, formatted as 'YYYY-MM-DD' or a descriptive phrase if a date isn't available (e.g., 'Ongoing').")
-    application_complexity: str = Field(description="Estimated complexity (e.g., 'Low', 'Medium', 'High').")
-    eligible_provinces: List[str] = Field(description="List of eligible provinces/states/regions. Use ['National'] if nationwide.")
-    geography_details: str = Field(description="Any specific local or regional restrictions not covered by provinces.")
-    eligible_applicant_type: List[str] = Field(description="List of organization types that can apply (e.g., 'Small Business', 'Non-profit', 'Individual').")
-    eligible_industries: List[str] = Field(description="List of specific industries or sectors targeted.")
-    target_beneficiaries: List[str] = Field(description="List of groups the grant is intended to support (e.g., 'Youth', 'Women-owned businesses').")
-    supported_project_types: List[str] = Field(description="List of projects the grant can fund (e.g., 'R&D', 'Equipment Purchase', 'Training').")
-    sdg_alignment: List[str] = Field(description="List of UN Sustainable Development Goals the grant aligns with.")
-    application_url: str = Field(description="Direct URL to the application page or program details.")
-    is_recurring: bool = Field(description="True if the grant is offered on a regular cycle (e.g., annually), False otherwise.")
-    notes: str = Field(description="Any essential caveats or additional information.")
-    application_docs_raw: str = Field(description="Raw text snippet listing required application documents.")
-    application_questions_text: str = Field(description="Raw text snippet of the main questions or sections in the application.")
-
 # - 2. LOAD RAW FILE
 def get_raw_file():
-    files = glob.glob("data/raw/grants_raw_*.csv")
+    # Names embed a %Y%m%d_%H%M%S timestamp, so the newest file sorts last by name; no stat() needed
+    try:
+        with os.scandir("data/raw") as entries:
+            files = [e.path for e in entries if e.name.startswith("grants_raw_") and e.name.endswith(".csv")]
+    except FileNotFoundError:
+        files = []
 
     if not files:
         logging.error("No raw CSV files found in data/raw")
         raise FileNotFoundError("No Raw CSV files avaliable")
 
-    latest = max(files, key=os.path.getctime)
+    latest = max(files)
     logging.info(f"Using latest raw file: {latest}")
 
     return latest
 
 
+# Clean CSV column order, fixed by the schema rather than inferred from each batch
+SCHEMA_COLS = tuple(GrantData.model_fields)
+
+
 # --3. VALIDATION LOGIC
 def _is_nan(x):
-    try:
-        return isinstance(x, float) and math.isnan(x)
-    except Exception:
-        return False
-
-def preprocess_row(record: dict) -> dict:
+    # NaN is the only value not equal to itself; None is treated as missing too
+    return x is None or (isinstance(x, float) and x != x)
+
+
+# Column groups, coerced the same way within each group
+LIST_FIELDS = (
+    "eligible_provinces",
+    "eligible_applicant_type",
+    "eligible_industries",
+    "target_beneficiaries",
+    "supported_project_types",
+    "sdg_alignment",
+)
+AMOUNT_FIELDS = ("amount_min", "amount_max")
+STR_FIELDS = (
+    "grant_id", "title", "description", "funder",
+    "funder_type", "funding_type", "application_complexity",
+    "geography_details", "application_url", "notes",
+    "application_docs_raw", "application_questions_text",
+)
+# is_recurring values read as True; anything else is False
+TRUE_VALUES = frozenset({True, 1, "1", "True", "true", "TRUE", "yes", "Yes"})
+# Everything that isn't part of a number: currency symbols, thousands separators, spaces
+_AMOUNT_JUNK_RE = re.compile(r"[^\d.\-]")
+
+
+def parse_list_cell(v) -> list:
     """
-    Try to coerce CSV string values into types expected by GrantData.
-    - Convert "['A','B']" or '["A","B"]' to Python list via ast.literal_eval
-    - Convert semicolon-separated strings "a;b" to list ["a","b"]
-    - Convert numeric floats to int for amount_min/amount_max if appropriate
-    - Convert NaN to None
-    - Convert 'True'/'False'/'1'/'0' to bool for is_recurring
-    - Strip whitespace and normalize empty strings to None where appropriate
+    One list-field cell as a list of strings:
+    - '["A","B"]' via orjson, or older "['A','B']" rows via ast.literal_eval
+    - semicolon- (or, for non-URLs, comma-) separated strings "a;b" split into items
+    - NaN, empty and non-string values become []
     """
-    out = dict(record)  # copy
-
-    # Fields that should be lists
-    list_fields = [
-        "eligible_provinces",
-        "eligible_applicant_type",
-        "eligible_industries",
-        "target_beneficiaries",
-        "supported_project_types",
-        "sdg_alignment",
-    ]
-
-    for f in list_fields:
-        v = out.get(f, None)
-        if v is None or _is_nan(v):
-            out[f] = []
-            continue
-        # If already a list, keep it
-        if isinstance(v, list):
-            continue
-        if isinstance(v, str):
-            s = v.strip()
-            if s == "":
-                out[f] = []
-                continue
-            # Try literal_eval for python list string
+    if not isinstance(v, str):
+        return []
+    s = v.strip()
+    if s == "":
+        return []
+    # JSON arrays (what the extractor writes) first, then python list strings
+    if s.startswith("["):
+        try:
+            parsed = orjson.loads(s)
+        except orjson.JSONDecodeError:
             try:
                 parsed = ast.literal_eval(s)
-                if isinstance(parsed, list):
-                    out[f] = [str(x).strip() for x in parsed]
-                    continue
             except Exception:
-                pass
-            # Try semicolon or comma separated
-            if ";" in s:
-                out[f] = [x.strip() for x in s.split(";") if x.strip()]
-                continue
-            if "," in s and not s.startswith("http"):
-                out[f] = [x.strip() for x in s.split(",") if x.strip()]
-                continue
-            # fallback single value
-            out[f] = [s]
-            continue
-        # Other types fallback to empty
-        out[f] = []
-
-    # Numeric amounts: accept floats/strings, convert to int (cents)
-    for amt_field in ("amount_min", "amount_max"):
-        v = out.get(amt_field, None)
-        if v is None or _is_nan(v) or (isinstance(v, str) and v.strip() == ""):
-            out[amt_field] = None
-            continue
-        try:
-            # if string with currency symbols, remove non-digit
-            if isinstance(v, str):
-                s = v.replace(",", "").strip()
-                # remove currency symbols
-                s = "".join(ch for ch in s if (ch.isdigit() or ch in ".-"))
-                val = float(s)
-            else:
-                val = float(v)
-            # convert to smallest unit (assumes input was whole dollars; adjust if already cents)
-            # If your extraction already outputs cents, remove the *100 below.
-            out[amt_field] = int(round(val))  # keep as integer unit (assume whole units)
-        except Exception:
-            out[amt_field] = None
-
-    # currency: normalize None or empty to "CAD" default if you want
-    cur = out.get("currency", None)
-    if cur is None or _is_nan(cur) or (isinstance(cur, str) and cur.strip() == ""):
-        out["currency"] = "CAD"
-    else:
-        out["currency"] = str(cur).strip().upper()
+                parsed = None
+        if isinstance(parsed, list):
+            return [str(x).strip() for x in parsed]
+    # Try semicolon or comma separated
+    if ";" in s:
+        return [x.strip() for x in s.split(";") if x.strip()]
+    if "," in s and not s.startswith("http"):
+        return [x.strip() for x in s.split(",") if x.strip()]
+    # fallback single value
+    return [s]
 
-    # deadline: keep as string, but convert NaN -> empty string
-    d = out.get("deadline", None)
-    if d is None or _is_nan(d):
-        out["deadline"] = ""
-    else:
-        out["deadline"] = str(d).strip()
-
-    # is_recurring: coerce to bool
-    ir = out.get("is_recurring", None)
-    if isinstance(ir, bool):
-        out["is_recurring"] = ir
-    elif ir in (1, "1", "True", "true", "TRUE", "yes", "Yes"):
-        out["is_recurring"] = True
-    elif ir in (0, "0", "False", "false", "FALSE", "no", "No", None):
-        out["is_recurring"] = False
+
+def _column(df, name):
+    """df[name], or an all-missing column when the raw CSV doesn't have it."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def _stripped_text(col):
+    """Values as stripped strings, with NaN as ""."""
+    return col.astype(str).str.strip().where(col.notna(), "")
+
+
+def _coerce_list_column(col):
+    # Lists repeat a lot across rows (e.g. "['National']"); parse each distinct value once
+    parsed = {v: parse_list_cell(v) for v in pd.unique(col.dropna())}
+    return [list(x) if isinstance(x, list) else [] for x in col.map(parsed)]
+
+
+def _coerce_amount_column(col):
+    # Numeric amounts: accept floats/strings, convert to int (whole units)
+    if pd.api.types.is_numeric_dtype(col):
+        amounts = col.astype(float)
     else:
-        out["is_recurring"] = False
-
-    # Strings: convert NaN to empty string for required string fields
-    str_fields = [
-        "grant_id", "title", "description", "funder",
-        "funder_type", "funding_type", "application_complexity",
-        "geography_details", "application_url", "notes",
-        "application_docs_raw", "application_questions_text"
-    ]
-    for f in str_fields:
-        v = out.get(f, None)
-        if v is None or _is_nan(v):
-            out[f] = ""
-        else:
-            out[f] = str(v).strip()
+        # strings with currency symbols: keep only digits, "." and "-"
+        digits = col.astype(str).str.replace(_AMOUNT_JUNK_RE, "", regex=True)
+        amounts = pd.to_numeric(digits.where(col.notna(), ""), errors="coerce")
+    amounts = amounts.round()
+    # object dtype keeps Python ints and None rather than letting pandas turn them back into floats
+    return pd.Series([None if pd.isna(x) else int(x) for x in amounts.tolist()], index=col.index, dtype=object)
+
+
+def _coerce_currency_column(col):
+    # normalize None or empty to "CAD"
+    currency = _stripped_text(col)
+    return currency.str.upper().where(currency != "", "CAD")
 
+
+def _coerce_bool_column(col):
+    return col.isin(TRUE_VALUES)
+
+
+# Column coercer for every GrantData field, keyed by field name
+COLUMN_COERCERS = {
+    **dict.fromkeys(LIST_FIELDS, _coerce_list_column),
+    **dict.fromkeys(AMOUNT_FIELDS, _coerce_amount_column),
+    "currency": _coerce_currency_column,
+    "is_recurring": _coerce_bool_column,
+    **dict.fromkeys(("deadline", *STR_FIELDS), _stripped_text),
+}
+
+
+def preprocess_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coerce raw CSV columns into the types expected by GrantData, a column at a time
+    through COLUMN_COERCERS:
+    - list fields parsed with parse_list_cell, once per distinct cell value
+    - amounts stripped of currency symbols/commas and rounded to int (None if unparseable)
+    - currency upper-cased, defaulting to "CAD"
+    - is_recurring to bool
+    - deadline and other string fields stripped, with NaN as ""
+    """
+    out = df.copy()
+    for f, coerce in COLUMN_COERCERS.items():
+        out[f] = coerce(_column(df, f))
     return out
 
 
+def _row_dicts(df):
+    """
+    Rows as plain dicts, zipped from itertuples instead of boxed one value at a time by to_dict.
+    Column names are interned so pydantic's field lookups compare keys by identity.
+    """
+    cols = tuple(sys.intern(str(c)) for c in df.columns)
+    return [dict(zip(cols, row)) for row in df.itertuples(index=False, name=None)]
+
+
+# Pulls a record's values out in SCHEMA_COLS order with one C-level call
+_schema_row = itemgetter(*SCHEMA_COLS)
+
+
+def _clean_rows(records):
+    """Validated record dicts as tuples in SCHEMA_COLS order, ready for csv.writer."""
+    return [_schema_row(record) for record in records]
+
+
 def validate_records(df):
-    valid_records = []
-    invalid_records = []
+    """
+    Validate one chunk of raw rows. Returns (valid rows as tuples in SCHEMA_COLS order,
+    invalid raw records as dicts with their validation_errors).
+    """
+    pre = preprocess_df(df)
 
-    for idx, row in df.iterrows():
-        record = row.to_dict()
-        pre = preprocess_row(record)
+    # preprocess_df gives every GrantData field its final type, so full validation can't
+    # reject a record; it only runs when PYDANTIC_STRICT=1 (e.g. in CI) to check that claim.
+    # Otherwise the coerced columns are the clean rows, with no per-record dict or model
+    if os.getenv("PYDANTIC_STRICT") != "1":
+        return list(pre[list(SCHEMA_COLS)].itertuples(index=False, name=None)), []
 
-        try:
-            validated = GrantData(**pre)
-            valid_records.append(validated.model_dump())
-        except ValidationError as e:
-            # structured errors from Pydantic
-            errors = e.errors() if hasattr(e, "errors") else str(e)
-            record["validation_errors"] = errors
-            invalid_records.append(record)
-            logging.warning(f"Validation failed for record {pre.get('grant_id', 'N/A')} - errors: {errors}")
+    pre_list = _row_dicts(pre)
+    try:
+        return _clean_rows(GrantListAdapter.dump_python(GrantListAdapter.validate_python(pre_list))), []
+    except ValidationError as e:
+        # Error locations start with the record's index; strip it so each record keeps its own errors
+        errors_by_index = {}
+        for err in e.errors():
+            errors_by_index.setdefault(err["loc"][0], []).append({**err, "loc": err["loc"][1:]})
+
+    good = [pre for i, pre in enumerate(pre_list) if i not in errors_by_index]
+    valid_records = _clean_rows(GrantListAdapter.dump_python(GrantListAdapter.validate_python(good)))
+
+    # Only the rejected raw rows are needed as dicts
+    invalid_positions = list(errors_by_index)
+    records = dict(zip(invalid_positions, _row_dicts(df.iloc[invalid_positions])))
+    invalid_records = []
+    for i, errors in errors_by_index.items():
+        record = records[i]
+        record["validation_errors"] = errors
+        invalid_records.append(record)
+        logging.warning(f"Validation failed for record {pre_list[i].get('grant_id', 'N/A')} - errors: {errors}")
 
     return valid_records, invalid_records
 
 
+def write_invalid_rows(writer: csv.DictWriter, rows: list):
+    """
+    Write invalid records; NaN from the raw CSV is written as an empty cell.
+    """
+    writer.writerows({k: "" if _is_nan(v) else v for k, v in row.items()} for row in rows)
+
+
+# Raw rows validated per chunk, so memory is bounded by the chunk rather than the file
+CHUNK_SIZE = 8192
+VALIDATION_WORKERS = os.cpu_count() or 1  # processes validating chunks in parallel
+
+
+def validate_chunks(chunks, workers=VALIDATION_WORKERS):
+    """
+    Yield (chunk columns, validate_records(chunk)) for each chunk, in file order.
+    With more than one worker the chunks are validated in a process pool; at most
+    two chunks per worker are in flight, so memory stays bounded on large files.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk.columns, validate_records(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append((chunk.columns, pool.submit(validate_records, chunk)))
+            if len(in_flight) >= 2 * workers:
+                columns, future = in_flight.popleft()
+                yield columns, future.result()
+        while in_flight:
+            columns, future = in_flight.popleft()
+            yield columns, future.result()
+
+
 # --4. MAIN EXECUTION
 def main():
     load_dotenv()
@@ -226,26 +290,45 @@ def main():
 
 
     input_file = get_raw_file()
-    df = pd.read_csv(input_file)
-    logging.info(f"Validating {len(df)} records...")
-
-    valid, invalid = validate_records(df)
+    chunk_size = int(os.getenv("VALIDATION_CHUNK_SIZE", CHUNK_SIZE))
+    logging.info(f"Validating records in chunks of {chunk_size}...")
 
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     clean_path = f"data/clean/grants_clean_{timestamp}.csv"
     invalid_path = f"data/metrics/invalid_records_{timestamp}.csv"
 
-    pd.DataFrame(valid).to_csv(clean_path, index=False)
-    pd.DataFrame(invalid).to_csv(invalid_path, index=False)
-
-    logging.info(f"Valid records: {len(valid)}")
-    logging.info(f"Invalid records: {len(invalid)}")
+    n_valid = n_invalid = 0
+    with open(clean_path, "w", newline="", encoding="utf-8") as clean_f, \
+            open(invalid_path, "w", newline="", encoding="utf-8") as invalid_f:
+        # Valid records arrive as tuples in schema order, so they go straight to csv.writer
+        # with no DataFrame in between (None is written as an empty cell)
+        clean_writer = csv.writer(clean_f)
+        clean_writer.writerow(SCHEMA_COLS)
+        invalid_writer = None
+
+        # Read every column as text: per-chunk type inference could otherwise turn the same
+        # column into ints in one chunk and floats in the next
+        chunks = pd.read_csv(input_file, chunksize=chunk_size, dtype=str)
+        for columns, (valid, invalid) in validate_chunks(chunks):
+            clean_writer.writerows(valid)
+            if invalid_writer is None:
+                invalid_writer = csv.DictWriter(
+                    invalid_f, fieldnames=list(columns) + ["validation_errors"], extrasaction="ignore"
+                )
+                invalid_writer.writeheader()
+            write_invalid_rows(invalid_writer, invalid)
+
+            n_valid += len(valid)
+            n_invalid += len(invalid)
+
+    logging.info(f"Valid records: {n_valid}")
+    logging.info(f"Invalid records: {n_invalid}")
     logging.info(f"Processed data saved to {clean_path}")
     logging.info(f"Invalid data saved to {invalid_path}")
 
     send_notification(
-        success_count=len(valid),
-        fail_count=len(invalid),
+        success_count=n_valid,
+        fail_count=n_invalid,
         csv_path=clean_path,
         log_path=log_file,
     )
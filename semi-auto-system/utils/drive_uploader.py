@@ -1,19 +1,25 @@
 import os
-import glob
+import io
+import gzip
+import shutil
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 from dotenv import load_dotenv
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaIoBaseUpload
 from google.oauth2.service_account import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 
 SCOPES = ["https://www.googleapis.com/auth/drive.file"]
-flow = InstalledAppFlow.from_client_secrets_file("config/oauth_client_secret.json", SCOPES)
-creds = flow.run_local_server(port=0)
-drive_service = build("drive", "v3", credentials=creds)
 
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # resumable upload chunk; must be a multiple of 256 KB
+SIMPLE_UPLOAD_MAX_BYTES = 5 * 1024 * 1024  # up to this size a file goes up uncompressed in a single request
+SERVICE_ACCOUNT_FILE = "config/google_service_account.json"
+
+_service_account_creds = None
+_service_account_drive = None
 
 
 # setting up logging
@@ -22,42 +28,112 @@ def setup_log():
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     log_file = f"data/logs/drive_upload_{timestamp}.log"
 
-    logging.basicConfig(
-        filename=log_file,
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-    )
-    logging.getLogger().addHandler(logging.StreamHandler())
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            filename=log_file,
+            level=logging.INFO,
+            format="%(asctime)s [%(levelname)s] %(message)s",
+        )
+        logging.getLogger().addHandler(logging.StreamHandler())
+    else:
+        # Under complete_pipeline: also write this stage's file (removed again when the stage ends)
+        handler = logging.FileHandler(log_file)
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        logging.getLogger().addHandler(handler)
     return log_file
 
 
 # Get latest processed files - find latest processed and metrics csvs to upload
+def _latest_by_name(directory, prefix):
+    """
+    Newest <prefix>*.csv in directory, or None. Names embed a %Y%m%d_%H%M%S timestamp,
+    so the newest file sorts last by name and a single scandir pass is enough.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return max(
+                (e.path for e in entries if e.name.startswith(prefix) and e.name.endswith(".csv")),
+                default=None,
+            )
+    except FileNotFoundError:
+        return None
+
+
 def get_latest_files():
 
-    clean_files = glob.glob("./data/clean/grants_clean_*.csv")
-    metric_files = glob.glob("./data/metrics/validation_metrics_*.csv")
+    latest_clean = _latest_by_name("data/clean", "grants_clean_")
+    latest_metric = _latest_by_name("data/metrics", "validation_metrics_")
 
-    if not clean_files:
+    if latest_clean is None:
         raise FileNotFoundError("No clean CSV file found.")
-    if not metric_files:
+    if latest_metric is None:
         raise FileNotFoundError("No metrics CSV file found.")
 
-    latest_clean = max(clean_files, key=os.path.getctime)
-    latest_metric = max(metric_files, key=os.path.getctime)
     return latest_clean, latest_metric
 
 
-# upload function to load file to google drive
-def upload_to_drive(file_path, drive_folder_id, drive_service):
+def get_drive_credentials():
+    """Service-account credentials, loaded once per process."""
+    global _service_account_creds
+    if _service_account_creds is None:
+        _service_account_creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+    return _service_account_creds
 
-    file_name = os.path.basename(file_path)
 
-    media = MediaFileUpload(file_path, resumable=True, mimetype="text/csv")
-    file_metadata = {"name": file_name, "parents": [drive_folder_id]}
+def new_authorized_http():
+    """A separate authorized connection, for uploading from another thread (httplib2 isn't thread-safe)."""
+    return AuthorizedHttp(get_drive_credentials(), http=httplib2.Http())
+
+
+def get_drive_service():
+    """
+    Service-account Drive client, built on first use (not at import) and reused by later uploads.
+    The discovery document ships with googleapiclient, so skip the discovery cache lookup.
+    """
+    global _service_account_drive
+    if _service_account_drive is None:
+        _service_account_drive = build("drive", "v3", credentials=get_drive_credentials(), cache_discovery=False)
+    return _service_account_drive
 
+
+def list_subfolders(drive_service, parent_folder):
+    """Map name -> id of every folder directly under parent_folder, from one paged list query."""
+    query = f"'{parent_folder}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
+    folders = {}
+    request = drive_service.files().list(q=query, fields="nextPageToken, files(id, name)", pageSize=1000)
+    while request is not None:
+        response = request.execute()
+        for folder in response.get("files", []):
+            folders.setdefault(folder["name"], folder["id"])
+        request = drive_service.files().list_next(request, response)
+    return folders
+
+
+# upload function to load file to google drive
+def upload_to_drive(file_path, drive_folder_id, drive_service, http=None):
+
+    # Files people open in Drive (the clean CSV, the one-row metrics file) stay plain CSV so Drive
+    # can preview them; only a CSV too big for a single request is gzipped and uploaded as <name>.gz
+    size = os.path.getsize(file_path)
+    if size <= SIMPLE_UPLOAD_MAX_BYTES:
+        file_name = os.path.basename(file_path)
+        with open(file_path, "rb") as f:
+            body = io.BytesIO(f.read())
+        media = MediaIoBaseUpload(body, mimetype="text/csv", resumable=False)
+    else:
+        file_name = os.path.basename(file_path) + ".gz"
+        body = io.BytesIO()
+        with open(file_path, "rb") as f_in, gzip.GzipFile(fileobj=body, mode="wb", compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out, 1 << 20)
+        body.seek(0)
+        # Streamed in resumable chunks unless compression brought it under the single-request limit
+        resumable = body.getbuffer().nbytes > SIMPLE_UPLOAD_MAX_BYTES
+        media = MediaIoBaseUpload(body, mimetype="application/gzip", resumable=resumable, chunksize=UPLOAD_CHUNK_SIZE)
+
+    file_metadata = {"name": file_name, "parents": [drive_folder_id]}
     uploaded_file = drive_service.files().create(
         body=file_metadata, media_body=media, fields="id"
-    ).execute()
+    ).execute(http=http)
 
     file_id = uploaded_file.get("id")
     logging.info(f"Uploaded '{file_name}' to Drive (file ID: {file_id})")
@@ -71,10 +147,7 @@ def main():
     logging.info("...Starting Google Drive Upload Phase...")
 
     # Prepare credentials
-    SCOPES = ["https://www.googleapis.com/auth/drive.file"]
-    SERVICE_ACCOUNT_FILE = "config/google_service_account.json"
-    creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    drive_service = build("drive", "v3", credentials=creds)
+    drive_service = get_drive_service()
 
     # Locate files
     clean_path, metrics_path = get_latest_files()
@@ -89,13 +162,13 @@ def main():
     now = datetime.utcnow()
     subfolder_name = f"{now.year}_{now.month:02d}"
 
+    # All existing subfolders in one lookup; only missing ones cost another request
+    existing_folders = list_subfolders(drive_service, parent_folder)
+
     def ensure_subfolder_exists(name):
         """Check or create a subfolder under the parent folder."""
-        query = f"'{parent_folder}' in parents and name='{name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-        results = drive_service.files().list(q=query, fields="files(id, name)").execute()
-        items = results.get("files", [])
-        if items:
-            return items[0]["id"]
+        if name in existing_folders:
+            return existing_folders[name]
         folder_metadata = {
             "name": name,
             "mimeType": "application/vnd.google-apps.folder",
@@ -103,6 +176,7 @@ def main():
         }
         folder = drive_service.files().create(body=folder_metadata, fields="id").execute()
         logging.info(f"Created folder '{name}' (ID: {folder['id']})")
+        existing_folders[name] = folder["id"]
         return folder["id"]
 
     # Create/locate subfolders
@@ -112,9 +186,15 @@ def main():
     month_clean_folder = ensure_subfolder_exists(f"CleanData/{subfolder_name}")
     month_metrics_folder = ensure_subfolder_exists(f"Metrics/{subfolder_name}")
 
-    # Upload files
-    upload_to_drive(clean_path, month_clean_folder, drive_service)
-    upload_to_drive(metrics_path, month_metrics_folder, drive_service)
+    # Upload files concurrently, each over its own connection
+    uploads = [(clean_path, month_clean_folder), (metrics_path, month_metrics_folder)]
+    with ThreadPoolExecutor(max_workers=len(uploads)) as pool:
+        futures = [
+            pool.submit(upload_to_drive, path, folder, drive_service, new_authorized_http())
+            for path, folder in uploads
+        ]
+        for future in futures:
+            future.result()
 
     logging.info("Upload phase complete.")
     logging.info(f"Log file: {log_file}")
@@ -1,5 +1,7 @@
 import os
+import atexit
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
@@ -7,7 +9,60 @@ import logging
 
 
 
-load_dotenv
+load_dotenv()
+
+_smtp = None
+_smtp_lock = threading.Lock()
+
+
+def _smtp_port():
+    """
+    SMTP_PORT as before (587, STARTTLS, by default). SMTP_SSL_PORT is read only
+    when SMTP_PORT isn't set.
+    """
+    return int(os.getenv("SMTP_PORT") or os.getenv("SMTP_SSL_PORT") or 587)
+
+
+def _open_smtp(smtp_server, smtp_port):
+    """Implicit TLS on port 465; on any other port a plain connection upgraded with STARTTLS."""
+    if smtp_port == 465:
+        return smtplib.SMTP_SSL(smtp_server, smtp_port, timeout=30)
+    server = smtplib.SMTP(smtp_server, smtp_port, timeout=30)
+    server.ehlo()
+    server.starttls()
+    return server
+
+
+def _get_smtp(smtp_server, smtp_port, sender, password):
+    """
+    Logged-in connection, opened on first use and reused by later notifications
+    while the server keeps it alive. Call with _smtp_lock held.
+    """
+    global _smtp
+    if _smtp is not None:
+        try:
+            if _smtp.noop()[0] == 250:
+                return _smtp
+        except (smtplib.SMTPException, OSError):
+            pass
+        _close_smtp()
+
+    _smtp = _open_smtp(smtp_server, smtp_port)
+    _smtp.login(sender, password)
+    return _smtp
+
+
+def _close_smtp():
+    global _smtp
+    if _smtp is not None:
+        try:
+            _smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        _smtp = None
+
+
+atexit.register(_close_smtp)
 
 
 def send_notification(success_count, fail_count, csv_path, log_path):
@@ -16,7 +71,7 @@ def send_notification(success_count, fail_count, csv_path, log_path):
     recipient = os.getenv("EMAIL_RECIPIENT")
     password = os.getenv("EMAIL_PASSWORD")
     smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", 587))
+    smtp_port = _smtp_port()
 
     if not all([sender, recipient, password]):
         logging.warning("Email credentials not set — skipping email")
@@ -31,26 +86,24 @@ def send_notification(success_count, fail_count, csv_path, log_path):
     msg["Subject"] = subject
     msg.attach(MIMEText(body, "plain"))
 
-    # Try STARTTLS first, fallback to SSL
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port, timeout=30)
-        server.ehlo()
-        server.starttls()
-        server.login(sender, password)
-        server.send_message(msg)
-        server.quit()
-        logging.info(f"Email sent to {recipient} via STARTTLS")
-        return
-    except Exception as e1:
-        logging.warning(f"STARTTLS failed: {e1}. Trying SSL on port 465...")
+    # The connection is kept for the next stage's notification; if the configured
+    # port fails, fall back to SSL on port 465 as before
+    with _smtp_lock:
         try:
-            server = smtplib.SMTP_SSL(smtp_server, 465, timeout=30)
-            server.login(sender, password)
+            server = _get_smtp(smtp_server, smtp_port, sender, password)
             server.send_message(msg)
-            server.quit()
-            logging.info(f"Email sent to {recipient} via SSL")
+            logging.info(f"Email sent to {recipient} via {'SSL' if isinstance(server, smtplib.SMTP_SSL) else 'STARTTLS'}")
             return
+        except Exception as e1:
+            _close_smtp()
+            if smtp_port == 465:
+                logging.error(f"Failed to send email: {e1}")
+                return
+            logging.warning(f"STARTTLS failed: {e1}. Trying SSL on port 465...")
+        try:
+            _get_smtp(smtp_server, 465, sender, password).send_message(msg)
+            logging.info(f"Email sent to {recipient} via SSL")
         except Exception as e2:
+            _close_smtp()
             logging.error(f"Failed to send email by SSL as well: {e2}")
             # do not raise — we don't want the pipeline to fail on email send
-            return
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Client-side rate limiting for Gemini calls.
+
+Each pipeline folder runs (and is deployed) on its own, so it carries its own
+copy of this module. extract-to-csv/rate_limit.py is the source: edit it,
+then run `python sync_shared.py` from the repository root to update the others.
+"""
+import time
+import asyncio
+
+
+class AsyncTokenBucket:
+    """
+    Request and token budgets that refill continuously up to one minute's quota.
+    acquire() only sleeps when a budget is empty, so bursts run at full speed
+    until the quota is actually reached.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    async def acquire(self, est_tokens: int = 0):
+        est_tokens = min(est_tokens, self.tpm)  # a single oversized call must still get through
+        while True:
+            # No await between the check and the deduction, so concurrent tasks can't double-spend
+            self._refill()
+            if self._requests >= 1 and self._tokens >= est_tokens:
+                self._requests -= 1
+                self._tokens -= est_tokens
+                return
+            wait = max(
+                (1 - self._requests) * 60.0 / self.rpm,
+                (est_tokens - self._tokens) * 60.0 / self.tpm,
+            )
+            await asyncio.sleep(wait)
+
+
+def estimate_tokens(prompt: str, max_output_tokens: int) -> int:
+    """Rough upper bound for a call: ~4 characters per prompt token plus the full output allowance."""
+    return len(prompt) // 4 + max_output_tokens
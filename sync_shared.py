@@ -0,0 +1,49 @@
+"""
+Keep the per-pipeline copies of shared modules identical to their source copy.
+
+    python sync_shared.py          # overwrite the copies from each source
+    python sync_shared.py --check  # exit 1 if any copy differs
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# source -> copies kept byte-identical to it
+SHARED = {
+    "extract-to-csv-model2/llm_cache.py": (
+        "extract-to-csv/llm_cache.py",
+        "semi-auto-system/utils/llm_cache.py",
+    ),
+    "extract-to-csv/rate_limit.py": (
+        "semi-auto-system/utils/rate_limit.py",
+    ),
+}
+
+
+def main(check=False):
+    stale = []
+    for source_path, copies in SHARED.items():
+        with open(os.path.join(ROOT, source_path), "rb") as f:
+            source = f.read()
+
+        for copy in copies:
+            path = os.path.join(ROOT, copy)
+            try:
+                with open(path, "rb") as f:
+                    current = f.read()
+            except FileNotFoundError:
+                current = None
+            if current == source:
+                continue
+            stale.append((copy, source_path))
+            if not check:
+                with open(path, "wb") as f:
+                    f.write(source)
+
+    for copy, source_path in stale:
+        print(f"{copy} {'differs from' if check else 'updated from'} {source_path}")
+    return 1 if check and stale else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(check="--check" in sys.argv[1:]))